@@ -3,5 +3,8 @@ ACCOUNTS = {
         "public_api": "",
         "secret_api": "",
         "password": "",
+        # "api_url": "http://127.0.0.1:8080",  # Bitget local (utilities/mock_bitget.py) pour les tests hors ligne
+        # "ws_url": "ws://127.0.0.1:8080/v2/ws/public",  # websocket public du Bitget local (mode --daemon --ws)
+        # "ws_private_url": "ws://127.0.0.1:8080/v2/ws/private",  # websocket privé du Bitget local (mode --daemon --ws)
     },
 }
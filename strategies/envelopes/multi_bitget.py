@@ -1,11 +1,15 @@
 import datetime
 import sys
+import time
 
 # Append the path to the Live-Tools-V2 directory for importing custom modules
 sys.path.append("./Live-Tools-V2")
 
 import asyncio
-from utilities.bitget_perp import PerpBitget
+from utilities.bitget_perp import BitgetSessionPool, OpenOrdersSnapshot, TIMEFRAME_MS
+from utilities.bitget_ws import BitgetCandleStream, BitgetAccountStream, BITGET_WS_PUBLIC_URL, BITGET_WS_PRIVATE_URL
+from utilities.order_reconciler import OrderReconciler
+from utilities.request_metrics import RequestMetrics
 from secret import ACCOUNTS
 import ta
 
@@ -14,322 +18,547 @@ if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 
-async def main():
-    # Get account details from ACCOUNTS dictionary
-    account = ACCOUNTS["bitget1"]
-
-    # Set trading parameters
-    margin_mode = "isolated"  # Margin mode can be 'isolated' or 'crossed'
-    exchange_leverage = 3  # Leverage to be used on the exchange
-
-    tf = "1h"  # Timeframe for OHLCV data
-    size_leverage = 3  # Leverage to be used for position sizing
-    sl = 0.3  # Stop-loss percentage
-
-    # Parameters for different trading pairs
-    params = {
-        "BTC/USDT": {
-            "src": "close",
-            "ma_base_window": 7,
-            "envelopes": [0.07, 0.1, 0.15],
-            "size": 0.1,
-            "sides": ["long", "short"],
-        },
-        "ETH/USDT": {
-            "src": "close",
-            "ma_base_window": 5,
-            "envelopes": [0.07, 0.1, 0.15],
-            "size": 0.1,
-            "sides": ["long", "short"],
-        },
-        "ADA/USDT": {
-            "src": "close",
-            "ma_base_window": 5,
-            "envelopes": [0.07, 0.09, 0.12, 0.15],
-            "size": 0.1,
-            "sides": ["long", "short"],
-        },
-        "DOGE/USDT": {
-            "src": "close",
-            "ma_base_window": 5,
-            "envelopes": [0.07, 0.1, 0.15, 0.2],
-            "size": 0.05,
-            "sides": ["long", "short"],
-        },
-    }
-
-    # Initialize exchange connection
-    exchange = PerpBitget(
-        public_api=account["public_api"],
-        secret_api=account["secret_api"],
-        password=account["password"],
+# Set trading parameters
+margin_mode = "isolated"  # Margin mode can be 'isolated' or 'crossed'
+exchange_leverage = 3  # Leverage to be used on the exchange
+
+tf = "1h"  # Timeframe for OHLCV data
+size_leverage = 3  # Leverage to be used for position sizing
+sl = 0.3  # Stop-loss percentage
+
+# Parameters for different trading pairs
+params = {
+    "BTC/USDT": {
+        "src": "close",
+        "ma_base_window": 7,
+        "envelopes": [0.07, 0.1, 0.15],
+        "size": 0.1,
+        "sides": ["long", "short"],
+    },
+    "ETH/USDT": {
+        "src": "close",
+        "ma_base_window": 5,
+        "envelopes": [0.07, 0.1, 0.15],
+        "size": 0.1,
+        "sides": ["long", "short"],
+    },
+    "ADA/USDT": {
+        "src": "close",
+        "ma_base_window": 5,
+        "envelopes": [0.07, 0.09, 0.12, 0.15],
+        "size": 0.1,
+        "sides": ["long", "short"],
+    },
+    "DOGE/USDT": {
+        "src": "close",
+        "ma_base_window": 5,
+        "envelopes": [0.07, 0.1, 0.15, 0.2],
+        "size": 0.05,
+        "sides": ["long", "short"],
+    },
+}
+
+invert_side = {"long": "sell", "short": "buy"}
+
+
+# Télécharger les bougies et calculer les indicateurs une seule fois, pour tous les comptes
+# min_open_ts (ms) : heure d'ouverture minimale de la dernière bougie, les paires en retard sont refusées
+async def get_indicators(exchange, pairs, min_open_ts=None, retries=5, retry_delay=0.2):
+    print(f"Getting data and indicators on {len(pairs)} pairs...")
+    df_list = {}
+    for attempt in range(retries + 1):
+        tasks = [exchange.get_last_ohlcv(pair, tf, 50) for pair in pairs]
+        dfs = await asyncio.gather(*tasks, return_exceptions=True)
+        late_pairs = []
+        for pair, df in zip(pairs, dfs):
+            # Une paire aux données incomplètes est ignorée pour ce passage, ses ordres restent en place
+            if isinstance(df, Exception):
+                print(f"Skipping {pair}: {df}")
+            elif df.attrs.get("failed_chunks"):
+                print(f"Skipping {pair}: {len(df.attrs['failed_chunks'])} ohlcv chunk(s) failed")
+            elif min_open_ts is not None and df.index[-1].value // 10**6 < min_open_ts:
+                late_pairs.append(pair)
+            else:
+                df_list[pair] = df
+        # La nouvelle bougie n'est pas encore publiée : iloc[-2] ne serait pas la bougie qui vient de clôturer
+        if not late_pairs:
+            break
+        if attempt == retries:
+            print(f"Skipping {', '.join(late_pairs)}: new candle not published yet")
+            break
+        pairs = late_pairs
+        await asyncio.sleep(retry_delay)
+
+    # Parcours de chaque paire dans df_list
+    for pair in df_list:
+        current_params = params[pair]  # Récupération des paramètres actuels pour la paire
+        df = df_list[pair]  # Récupération du DataFrame correspondant à la paire
+
+        # Calcul de la moyenne mobile simple (SMA)
+        df["ma_base"] = ta.trend.sma_indicator(
+            close=get_source(pair, df), window=current_params["ma_base_window"]
+        )
+
+        # Calcul des enveloppes supérieures et inférieures
+        for column, values in envelope_levels(pair, df["ma_base"]).items():
+            df[column] = values
+
+        df_list[pair] = df  # Mise à jour du DataFrame dans df_list avec les colonnes ajoutées
+
+    return df_list
+
+
+# Choix de la source pour le calcul de la moyenne mobile, sur un DataFrame de bougies ou une seule bougie
+def get_source(pair, candles):
+    if params[pair]["src"] == "close":
+        return candles["close"]  # Utilisation du prix de clôture
+    elif params[pair]["src"] == "ohlc4":
+        return (candles["close"] + candles["high"] + candles["low"] + candles["open"]) / 4  # Calcul de OHLC4
+
+
+# Niveaux des enveloppes à partir de la moyenne mobile (valeur seule ou colonne)
+def envelope_levels(pair, ma_base) -> dict:
+    envelopes = params[pair]["envelopes"]
+    high_envelopes = [round(1 / (1 - e) - 1, 3) for e in envelopes]  # Enveloppes supérieures à partir des pourcentages
+    levels = {"ma_base": ma_base}
+    for i in range(1, len(envelopes) + 1):
+        levels[f"ma_high_{i}"] = ma_base * (1 + high_envelopes[i - 1])  # MA hautes
+        levels[f"ma_low_{i}"] = ma_base * (1 - envelopes[i - 1])  # MA basses
+    return levels
+
+
+# Régler le mode de marge et le levier d'un compte sur toutes les paires
+async def set_leverage(name, exchange, pairs):
+    try:
+        print(f"[{name}] Setting {margin_mode} x{exchange_leverage} on {len(pairs)} pairs...")
+        tasks = [
+            exchange.set_margin_mode_and_leverage(pair, margin_mode, exchange_leverage)
+            for pair in pairs
+        ]
+        await asyncio.gather(*tasks)  # Set leverage and margin mode for all pairs
+    except Exception as e:
+        print(f"[{name}] {e}")
+
+
+# Ordre d'entrée sur le niveau i de l'enveloppe (ma_low à l'achat, ma_high à la vente), prix et quantité non arrondis
+def entry_order(pair, side, row, i, usdt_balance) -> dict:
+    level = row[f"ma_low_{i+1}"] if side == "buy" else row[f"ma_high_{i+1}"]
+    return dict(
+        pair=pair,
+        side=side,
+        price=level,
+        trigger_price=level * (1.005 if side == "buy" else 0.995),
+        size=(params[pair]["size"] * usdt_balance) / len(params[pair]["envelopes"]) * size_leverage / level,
+        type="limit",
+        reduce=False,
+        margin_mode=margin_mode,
     )
-    invert_side = {"long": "sell", "short": "buy"}
 
-    print(f"--- Execution started at {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---")
-    try:
-        # Load market data using cctx load_markets method
-        await exchange.load_markets()
-
-        # Validate and filter trading pairs
-        for pair in params.copy():
-            info = exchange.get_pair_info(pair)
-            if info is None:
-                print(f"Pair {pair} not found, removing from params...")
-                del params[pair]
-
-        pairs = list(params.keys())
-
-        try:
-            print(f"Setting {margin_mode} x{exchange_leverage} on {len(pairs)} pairs...")
-            tasks = [
-                exchange.set_margin_mode_and_leverage(pair, margin_mode, exchange_leverage)
-                for pair in pairs
-            ]
-            await asyncio.gather(*tasks)  # Set leverage and margin mode for all pairs
-        except Exception as e:
-            print(e)
-
-        print(f"Getting data and indicators on {len(pairs)} pairs...")
-        tasks = [exchange.get_last_ohlcv(pair, tf, 50) for pair in pairs]
-        dfs = await asyncio.gather(*tasks)
-        df_list = dict(zip(pairs, dfs))
-
-        # Parcours de chaque paire dans df_list
-        for pair in df_list:
-            current_params = params[pair]  # Récupération des paramètres actuels pour la paire
-            df = df_list[pair]  # Récupération du DataFrame correspondant à la paire
-
-            # Choix de la source pour le calcul de la moyenne mobile
-            if current_params["src"] == "close":
-                src = df["close"]  # Utilisation du prix de clôture
-            elif current_params["src"] == "ohlc4":
-                src = (df["close"] + df["high"] + df["low"] + df["open"]) / 4  # Calcul de OHLC4
-
-            # Calcul de la moyenne mobile simple (SMA)
-            df["ma_base"] = ta.trend.sma_indicator(
-                close=src, window=current_params["ma_base_window"]
-            )
 
-            # Calcul des enveloppes supérieures et inférieures
-            high_envelopes = [
-                round(1 / (1 - e) - 1, 3) for e in current_params["envelopes"]
-            ]  # Calcul des enveloppes supérieures à partir des pourcentages
-            for i in range(1, len(current_params["envelopes"]) + 1):
-                df[f"ma_high_{i}"] = df["ma_base"] * (1 + high_envelopes[i - 1])  # Calcul des MA hautes
-                df[f"ma_low_{i}"] = df["ma_base"] * (
-                    1 - current_params["envelopes"][i - 1]
-                )  # Calcul des MA basses
-
-            df_list[pair] = df  # Mise à jour du DataFrame dans df_list avec les colonnes ajoutées
-
-        # Get account balance
-        usdt_balance = await exchange.get_balance()
-        usdt_balance = usdt_balance.total
-        print(f"Balance: {round(usdt_balance, 2)} USDT")
-
-        # Get all open trigger orders for each pair
-        tasks = [exchange.get_open_trigger_orders(pair) for pair in pairs]
-        print(f"Getting open trigger orders...")
-        trigger_orders = await asyncio.gather(*tasks)
-        trigger_order_list = dict(zip(pairs, trigger_orders))
-
-        # Cancel all trigger orders
-        tasks = []
-        for pair in df_list:
-            params[pair]["canceled_orders_buy"] = len(
-                [order for order in trigger_order_list[pair] if (order.side == "buy" and order.reduce is False)]
-            )
-            params[pair]["canceled_orders_sell"] = len(
-                [order for order in trigger_order_list[pair] if (order.side == "sell" and order.reduce is False)]
-            )
-            tasks.append(exchange.cancel_trigger_orders(pair, [order.id for order in trigger_order_list[pair]]))
-        print(f"Canceling trigger orders...")
-        await asyncio.gather(*tasks)
-
-        # Get all open limit orders for each pair
-        tasks = [exchange.get_open_orders(pair) for pair in pairs]
-        print(f"Getting open orders...")
-        orders = await asyncio.gather(*tasks)
-        order_list = dict(zip(pairs, orders))
-
-        # Cancel all open limit orders
-        tasks = []
-        for pair in df_list:
-            params[pair]["canceled_orders_buy"] += len(
-                [order for order in order_list[pair] if (order.side == "buy" and order.reduce is False)]
-            )
-            params[pair]["canceled_orders_sell"] += len(
-                [order for order in order_list[pair] if (order.side == "sell" and order.reduce is False)]
-            )
-            tasks.append(exchange.cancel_orders(pair, [order.id for order in order_list[pair]]))
-        print(f"Canceling limit orders...")
-        await asyncio.gather(*tasks)
-
-        # Get all open positions
-        print(f"Getting live positions...")
-        positions = await exchange.get_open_positions(pairs)
-
-        tasks_close = []
-        tasks_open = []
-        for position in positions:
-            print(
-                f"Current position on {position.pair} {position.side} - {position.size} ~ {position.usd_size} $"
-            )
-            row = df_list[position.pair].iloc[-2]
-
-            # Close existing positions
-            tasks_close.append(
-                exchange.place_order(
-                    pair=position.pair,
-                    side=invert_side[position.side],
-                    price=row["ma_base"],
-                    size=exchange.amount_to_precision(position.pair, position.size),
-                    type="limit",
-                    reduce=True,
-                    margin_mode=margin_mode,
-                    error=False,
-                )
-            )
-            if position.side == "long":
-                sl_side = "sell"
-                sl_price = exchange.price_to_precision(position.pair, position.entry_price * (1 - sl))
-            elif position.side == "short":
-                sl_side = "buy"
-                sl_price = exchange.price_to_precision(position.pair, position.entry_price * (1 + sl))
-
-            tasks_close.append(
-                exchange.place_trigger_order(
-                    pair=position.pair,
-                    side=sl_side,
-                    trigger_price=sl_price,
-                    price=None,
-                    size=exchange.amount_to_precision(position.pair, position.size),
-                    type="market",
-                    reduce=True,
-                    margin_mode=margin_mode,
-                    error=False,
-                )
+# Carnet voulu d'un compte à partir de la ligne d'indicateurs de chaque paire (bougie qui vient de clôturer)
+# Les prix et quantités de tout le plan sont arrondis en une seule passe à la fin
+def build_orders(exchange, pairs, rows, usdt_balance, positions, open_orders_count) -> list:
+    orders = []
+    for position in positions:
+        row = rows[position.pair]
+        envelopes_count = len(params[position.pair]["envelopes"])
+
+        # Close existing positions
+        orders.append(
+            dict(
+                pair=position.pair,
+                side=invert_side[position.side],
+                price=row["ma_base"],
+                size=position.size,
+                type="limit",
+                reduce=True,
+                margin_mode=margin_mode,
             )
+        )
+
+        # Keep the entry orders that are still resting, re-targeted on the new moving average:
+        # inner levels fill first, so the open_orders_count resting orders of a side are its outermost levels
+        # (the reconciler keeps or amends them, filled levels are not placed again)
+        for side in ["buy", "sell"]:
+            for i in range(envelopes_count - open_orders_count[position.pair][side], envelopes_count):
+                orders.append(entry_order(position.pair, side, row, i, usdt_balance))
+
+    # Pairs not currently in a position
+    pairs_in_position = [position.pair for position in positions]
+    for pair in pairs:
+        if pair in pairs_in_position:
+            continue
+        for i in range(len(params[pair]["envelopes"])):
+            if "long" in params[pair]["sides"]:
+                orders.append(entry_order(pair, "buy", rows[pair], i, usdt_balance))
+            if "short" in params[pair]["sides"]:
+                orders.append(entry_order(pair, "sell", rows[pair], i, usdt_balance))
+
+    # Arrondi vectorisé : toutes les quantités, tous les prix de déclenchement et les prix limites des entrées
+    # (le prix de l'ordre de clôture reste la moyenne mobile brute)
+    sizes = exchange.amounts_to_precision(
+        [order["pair"] for order in orders], [order["size"] for order in orders]
+    )
+    for order, size in zip(orders, sizes):
+        order["size"] = size
+    for key, rounded in [
+        ("trigger_price", [order for order in orders if "trigger_price" in order]),
+        ("price", [order for order in orders if not order["reduce"]]),
+    ]:
+        prices = exchange.prices_to_precision(
+            [order["pair"] for order in rounded], [order[key] for order in rounded]
+        )
+        for order, price in zip(rounded, prices):
+            order[key] = price
+    return orders
+
+
+# Prix du stop loss de chaque position, à sl du prix d'entrée
+def stop_loss_prices(exchange, positions) -> list:
+    return exchange.prices_to_precision(
+        [position.pair for position in positions],
+        [
+            position.entry_price * (1 - sl) if position.side == "long" else position.entry_price * (1 + sl)
+            for position in positions
+        ],
+    )
 
-            # Place new trigger orders
-            for i in range(
-                len(params[position.pair]["envelopes"]) - params[position.pair]["canceled_orders_buy"],
-                len(params[position.pair]["envelopes"]),
-            ):
-                tasks_open.append(
-                    exchange.place_trigger_order(
-                        pair=position.pair,
-                        side="buy",
-                        price=exchange.price_to_precision(position.pair, row[f"ma_low_{i+1}"]),
-                        trigger_price=exchange.price_to_precision(position.pair, row[f"ma_low_{i+1}"] * 1.005),
-                        size=exchange.amount_to_precision(
-                            position.pair,
-                            (
-                                (params[position.pair]["size"] * usdt_balance)
-                                / len(params[position.pair]["envelopes"])
-                                * size_leverage
-                            )
-                            / row[f"ma_low_{i+1}"],
-                        ),
-                        type="limit",
-                        reduce=False,
-                        margin_mode=margin_mode,
-                        error=False,
-                    )
-                )
-            for i in range(
-                len(params[position.pair]["envelopes"]) - params[position.pair]["canceled_orders_sell"],
-                len(params[position.pair]["envelopes"]),
-            ):
-                tasks_open.append(
-                    exchange.place_trigger_order(
-                        pair=position.pair,
-                        side="sell",
-                        trigger_price=exchange.price_to_precision(position.pair, row[f"ma_high_{i+1}"] * 0.995),
-                        price=exchange.price_to_precision(position.pair, row[f"ma_high_{i+1}"]),
-                        size=exchange.amount_to_precision(
-                            position.pair,
-                            (
-                                (params[position.pair]["size"] * usdt_balance)
-                                / len(params[position.pair]["envelopes"])
-                                * size_leverage
-                            )
-                            / row[f"ma_high_{i+1}"],
-                        ),
-                        type="limit",
-                        reduce=False,
-                        margin_mode=margin_mode,
-                        error=False,
-                    )
-                )
 
-        # Place orders to close positions
-        print(f"Placing {len(tasks_close)} close SL / limit order...")
-        await asyncio.gather(*tasks_close)
+# Passage de la stratégie sur un compte : levier, solde, ordres et positions sont propres au compte
+# rows : ligne d'indicateurs par paire, ou tâche qui la fournira (lancée en parallèle des lectures du compte)
+# usdt_balance : solde déjà lu pendant la préparation, sinon il est lu ici
+# account_state : source des lectures du compte (cache du websocket privé), exchange par défaut
+async def run_account(name, exchange, pairs, rows, leverage=True, usdt_balance=None, account_state=None):
+    account_state = account_state or exchange
+    if leverage:
+        await set_leverage(name, exchange, pairs)
+
+    # Get account balance, all resting trigger and limit orders and all open positions
+    print(f"[{name}] Getting balance, open orders and live positions...")
+    balance, open_orders, positions = await asyncio.gather(
+        account_state.get_balance() if usdt_balance is None else asyncio.sleep(0, usdt_balance),
+        account_state.get_open_orders_snapshot(pairs),
+        account_state.get_open_positions(pairs),
+    )
+    usdt_balance = balance.total if usdt_balance is None else usdt_balance
+    print(f"[{name}] Balance: {round(usdt_balance, 2)} USDT")
+    if asyncio.isfuture(rows):
+        rows = await rows
+
+    # Les paires sans indicateurs pour ce passage sont laissées telles quelles, ordres compris
+    pairs = [pair for pair in pairs if pair in rows]
+    positions = [position for position in positions if position.pair in rows]
+    open_orders = OpenOrdersSnapshot(
+        orders={pair: open_orders.orders[pair] for pair in pairs},
+        trigger_orders={pair: open_orders.trigger_orders[pair] for pair in pairs},
+        position_tpsl={pair: open_orders.position_tpsl.get(pair, []) for pair in pairs},
+    )
 
-        # Pairs not currently in a position
-        pairs_not_in_position = [
-            pair for pair in pairs if pair not in [position.pair for position in positions]
+    # Count the entry orders still open per side
+    open_orders_count = {}
+    for pair in pairs:
+        entry_orders = [
+            order
+            for order in open_orders.orders[pair] + open_orders.trigger_orders[pair]
+            if order.reduce is False
         ]
-        for pair in pairs_not_in_position:
-            row = df_list[pair].iloc[-2]
-            for i in range(len(params[pair]["envelopes"])):
-                if "long" in params[pair]["sides"]:
-                    tasks_open.append(
-                        exchange.place_trigger_order(
-                            pair=pair,
-                            side="buy",
-                            price=exchange.price_to_precision(pair, row[f"ma_low_{i+1}"]),
-                            trigger_price=exchange.price_to_precision(pair, row[f"ma_low_{i+1}"] * 1.005),
-                            size=exchange.amount_to_precision(
-                                pair,
-                                (
-                                    (params[pair]["size"] * usdt_balance)
-                                    / len(params[pair]["envelopes"])
-                                    * size_leverage
-                                )
-                                / row[f"ma_low_{i+1}"],
-                            ),
-                            type="limit",
-                            reduce=False,
-                            margin_mode=margin_mode,
-                            error=False,
-                        )
-                    )
-                if "short" in params[pair]["sides"]:
-                    tasks_open.append(
-                        exchange.place_trigger_order(
-                            pair=pair,
-                            side="sell",
-                            trigger_price=exchange.price_to_precision(pair, row[f"ma_high_{i+1}"] * 0.995),
-                            price=exchange.price_to_precision(pair, row[f"ma_high_{i+1}"]),
-                            size=exchange.amount_to_precision(
-                                pair,
-                                (
-                                    (params[pair]["size"] * usdt_balance)
-                                    / len(params[pair]["envelopes"])
-                                    * size_leverage
-                                )
-                                / row[f"ma_high_{i+1}"],
-                            ),
-                            type="limit",
-                            reduce=False,
-                            margin_mode=margin_mode,
-                            error=False,
-                        )
-                    )
+        open_orders_count[pair] = {
+            "buy": len([order for order in entry_orders if order.side == "buy"]),
+            "sell": len([order for order in entry_orders if order.side == "sell"]),
+        }
+
+    for position in positions:
+        print(
+            f"[{name}] Current position on {position.pair} {position.side} - {position.size} ~ {position.usd_size} $"
+        )
+    desired = build_orders(exchange, pairs, rows, usdt_balance, positions, open_orders_count)
+
+    # Only cancel, amend or place the orders that differ from the resting ones
+    reconciler = OrderReconciler(exchange)
+    plan = reconciler.diff(desired, open_orders)
+    print(
+        f"[{name}] Reconciling orders: {plan.kept} kept, {len(plan.amend_trigger_orders)} amended, "
+        f"{len(plan.cancel_orders) + len(plan.cancel_trigger_orders)} canceled, "
+        f"{len(plan.place_orders) + len(plan.place_trigger_orders)} placed..."
+    )
+    # Le stop loss est attaché à la position : aucune requête tant que le prix d'entrée ne change pas
+    stop_loss_tasks = [
+        exchange.set_position_tpsl(
+            position.pair,
+            position.side,
+            stop_loss_price=sl_price,
+            current=open_orders.position_tpsl[position.pair],
+        )
+        for position, sl_price in zip(positions, stop_loss_prices(exchange, positions))
+    ]
+    stop_losses, _ = await asyncio.gather(asyncio.gather(*stop_loss_tasks), reconciler.apply(plan))
+    sl_updates = len([resp for resp in stop_losses if resp])
+    if sl_updates:
+        print(f"[{name}] Stop loss set on {sl_updates} position(s)")
+
+
+# Créer la connexion publique pour les données de marché et une connexion par compte pour le reste,
+# toutes sur le même pool de connexions
+def create_exchanges(account_names):
+    accounts = {name: ACCOUNTS[name] for name in account_names}
+    metrics = RequestMetrics()
+    session_pool = BitgetSessionPool()
+    market_exchange = session_pool.create(
+        ohlcv_cache_dir="./Live-Tools-V2/cache/ohlcv",
+        markets_cache_path="./Live-Tools-V2/cache/markets.json",
+        api_url=accounts[account_names[0]].get("api_url"),
+        metrics=metrics,
+    )
+    exchanges = {
+        name: session_pool.create(
+            public_api=account["public_api"],
+            secret_api=account["secret_api"],
+            password=account["password"],
+            api_url=account.get("api_url"),
+            metrics=metrics,
+        )
+        for name, account in accounts.items()
+    }
+    return market_exchange, exchanges, metrics, session_pool
+
+
+# Charger les marchés une fois et renvoyer les paires disponibles
+# Les clients sont créés par le même BitgetSessionPool : seul market_exchange fait la requête, les comptes reprennent ses marchés
+async def load_markets(market_exchange, exchanges, reload=False):
+    # Load market data using cctx load_markets method
+    await market_exchange.load_markets(reload=reload)
+    await asyncio.gather(*[exchange.load_markets() for exchange in exchanges.values()])
+
+    # Validate and filter trading pairs
+    pairs = []
+    for pair in params:
+        if market_exchange.get_pair_info(pair) is None:
+            print(f"Pair {pair} not found, skipping...")
+        else:
+            pairs.append(pair)
+    return pairs
+
+
+# Un passage complet : indicateurs calculés une fois, puis tous les comptes en parallèle
+# Renvoie les erreurs rencontrées par compte
+async def run_cycle(market_exchange, exchanges, pairs, leverage=True, min_open_ts=None) -> dict:
+    df_list = await get_indicators(market_exchange, pairs, min_open_ts)
+    pairs = list(df_list.keys())
+
+    rows = {pair: df.iloc[-2] for pair, df in df_list.items()}
+
+    print(f"Running on {len(exchanges)} account(s): {', '.join(exchanges)}")
+    results = await asyncio.gather(
+        *[run_account(name, exchange, pairs, rows, leverage) for name, exchange in exchanges.items()],
+        return_exceptions=True,
+    )
+    return account_errors(exchanges, results)
+
+
+# Afficher et renvoyer les erreurs par compte d'un asyncio.gather(..., return_exceptions=True)
+def account_errors(exchanges, results) -> dict:
+    errors = {}
+    for name, result in zip(exchanges, results):
+        if isinstance(result, Exception):
+            print(f"Error on account {name} - Error => {str(result)}")
+            errors[name] = result
+    return errors
+
+
+# Phase 1, avant la clôture : bougies à jour, somme des sources des ma_base_window - 1 dernières bougies clôturées
+# par paire et solde de chaque compte ; la bougie en cours (dernière ligne) est celle qui va clôturer
+async def prepare_cycle(market_exchange, exchanges, pairs, close_ts, account_states=None) -> dict:
+    account_states = account_states or exchanges
+    closing_open_ts = close_ts - TIMEFRAME_MS[tf]
+    df_list, balances = await asyncio.gather(
+        get_indicators(market_exchange, pairs),
+        asyncio.gather(*[account_states[name].get_balance() for name in exchanges]),
+    )
+    partial_sums = {}
+    for pair, df in df_list.items():
+        if df.index[-1].value // 10**6 != closing_open_ts:
+            print(f"Skipping {pair}: last candle is not the one closing at the boundary")
+            continue
+        window = params[pair]["ma_base_window"]
+        partial_sums[pair] = get_source(pair, df.iloc[:-1]).tail(window - 1).sum()
+    return {
+        "close_ts": close_ts,
+        "partial_sums": partial_sums,
+        "balances": {name: balance.total for name, balance in zip(exchanges, balances)},
+    }
 
-        # Place orders to open new positions
-        print(f"Placing {len(tasks_open)} open limit order...")
-        await asyncio.gather(*tasks_open)
 
-        await exchange.close()
+# Bougie qui vient de clôturer pour chaque paire, une requête par paire sur le cache de bougies déjà à jour
+# Nouvelle tentative tant que la bougie suivante n'est pas publiée
+async def get_closing_candles(exchange, pairs, close_ts, retries=5, retry_delay=0.2) -> dict:
+    closing_open_ts = close_ts - TIMEFRAME_MS[tf]
+    candles = {}
+    for attempt in range(retries + 1):
+        dfs = await asyncio.gather(
+            *[exchange.get_last_ohlcv(pair, tf, 2) for pair in pairs], return_exceptions=True
+        )
+        late_pairs = []
+        for pair, df in zip(pairs, dfs):
+            if isinstance(df, Exception):
+                print(f"Skipping {pair}: {df}")
+            elif df.attrs.get("failed_chunks"):
+                print(f"Skipping {pair}: {len(df.attrs['failed_chunks'])} ohlcv chunk(s) failed")
+            elif len(df) < 2 or df.index[-1].value // 10**6 < close_ts:
+                late_pairs.append(pair)
+            elif df.index[-2].value // 10**6 != closing_open_ts:
+                print(f"Skipping {pair}: closing candle missing")
+            else:
+                candles[pair] = df.iloc[-2]
+        if not late_pairs:
+            break
+        if attempt == retries:
+            print(f"Skipping {', '.join(late_pairs)}: new candle not published yet")
+            break
+        pairs = late_pairs
+        await asyncio.sleep(retry_delay)
+    return candles
+
+
+# Phase 2, à la clôture : seule la bougie qui vient de clôturer est téléchargée, en parallèle des ordres
+# et positions de chaque compte, puis la moyenne mobile et les enveloppes sont complétées et le plan envoyé
+async def fire_cycle(market_exchange, exchanges, prepared, account_states=None) -> dict:
+    account_states = account_states or {}
+    pairs = list(prepared["partial_sums"])
+
+    async def get_rows():
+        candles = await get_closing_candles(market_exchange, pairs, prepared["close_ts"])
+        return {
+            pair: envelope_levels(
+                pair,
+                (prepared["partial_sums"][pair] + get_source(pair, candle)) / params[pair]["ma_base_window"],
+            )
+            for pair, candle in candles.items()
+        }
+
+    rows = asyncio.ensure_future(get_rows())
+    print(f"Running on {len(exchanges)} account(s): {', '.join(exchanges)}")
+    results = await asyncio.gather(
+        *[
+            run_account(name, exchange, pairs, rows, False, prepared["balances"][name], account_states.get(name))
+            for name, exchange in exchanges.items()
+        ],
+        return_exceptions=True,
+    )
+    await asyncio.gather(rows, return_exceptions=True)
+    return account_errors(exchanges, results)
+
+
+# Lancer la stratégie sur plusieurs comptes en parallèle (tous ceux de ACCOUNTS par défaut)
+# Marchés, bougies et indicateurs sont chargés une seule fois et partagés entre les comptes
+# Lancé moins de early_start_tolerance secondes avant une clôture sur l'horloge du serveur (horloge locale en avance),
+# le passage attend cette clôture au lieu de travailler sur la bougie précédente
+async def main(account_names=None, early_start_tolerance=60):
+    market_exchange, exchanges, metrics, session_pool = create_exchanges(account_names or list(ACCOUNTS))
+
+    print(f"--- Execution started at {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---")
+    try:
+        pairs, _ = await asyncio.gather(load_markets(market_exchange, exchanges), market_exchange.sync_time())
+        boundaries = market_exchange.candle_boundaries(tf)
+        if boundaries.close_ts - market_exchange.server_time_ms() < early_start_tolerance * 1000:
+            print("Waiting for the candle to close on the Bitget clock...")
+            min_open_ts = await market_exchange.wait_candle_close(tf, close_ts=boundaries.close_ts)
+        else:
+            min_open_ts = boundaries.open_ts
+        errors = await run_cycle(market_exchange, exchanges, pairs, min_open_ts=min_open_ts)
+        print(metrics.summary())
+        if errors:
+            raise next(iter(errors.values()))
         print(f"--- Execution finished at {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---")
-    except Exception as e:
-        await exchange.close()
-        raise e
+    finally:
+        await asyncio.gather(market_exchange.close(), *[exchange.close() for exchange in exchanges.values()])
+        await session_pool.close()
+        metrics.dump("./Live-Tools-V2/metrics/multi_bitget.prom")
+
+
+# Mode résident : connexions, marchés et bougies restent chargés entre deux passages,
+# chaque passage est lancé à la clôture de la bougie, d'après l'heure du serveur Bitget
+# Le plan d'ordres est préparé prepare_lead secondes avant la clôture (bougies, moyenne mobile partielle, soldes),
+# à la clôture il ne reste qu'à télécharger la dernière bougie, compléter le plan et l'envoyer
+# Le levier est réglé au démarrage et à chaque rechargement des marchés, pas à chaque passage
+# use_ws=True lit les bougies sur le websocket Bitget (tampons en mémoire) au lieu de les télécharger en REST,
+# et le solde, les ordres et les positions dans le cache du websocket privé de chaque compte
+async def daemon(
+    account_names=None, close_delay=0.2, prepare_lead=5, markets_reload_interval=6 * 3600, use_ws=False
+):
+    account_names = account_names or list(ACCOUNTS)
+    market_exchange, exchanges, metrics, session_pool = create_exchanges(account_names)
+    candles = market_exchange
+    account_states = None
+    if use_ws:
+        candles = BitgetCandleStream(
+            market_exchange, url=ACCOUNTS[account_names[0]].get("ws_url", BITGET_WS_PUBLIC_URL), capacity=200
+        )
+        account_states = {
+            name: BitgetAccountStream(exchange, url=ACCOUNTS[name].get("ws_private_url", BITGET_WS_PRIVATE_URL))
+            for name, exchange in exchanges.items()
+        }
+    print(f"--- Daemon started at {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---")
+    try:
+        pairs = await load_markets(market_exchange, exchanges)
+        markets_loaded_at = time.monotonic()
+        await asyncio.gather(*[set_leverage(name, exchange, pairs) for name, exchange in exchanges.items()])
+        await market_exchange.sync_time()
+        market_exchange.start_time_sync()
+        # Remplir le cache de bougies (ou les tampons du websocket) avant la première clôture
+        if use_ws:
+            await candles.subscribe(pairs, tf)
+            await asyncio.gather(*[account_state.start() for account_state in account_states.values()])
+        await get_indicators(candles, pairs)
+
+        while True:
+            next_close = market_exchange.candle_boundaries(tf).close_ts
+            await market_exchange.wait_candle_close(tf, -prepare_lead, next_close)
+
+            prepared = None
+            try:
+                prepared = await prepare_cycle(candles, exchanges, pairs, next_close, account_states)
+            except Exception as e:
+                print(f"Error while preparing cycle - Error => {str(e)}")
+            await market_exchange.wait_candle_close(tf, close_delay, next_close)
+
+            print(f"--- Cycle started at {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]} ---")
+            cycle_start = time.monotonic()
+            try:
+                if prepared is not None:
+                    await fire_cycle(candles, exchanges, prepared, account_states)
+                else:
+                    await run_cycle(candles, exchanges, pairs, leverage=False, min_open_ts=next_close)
+            except Exception as e:
+                print(f"Error during cycle - Error => {str(e)}")
+            print(f"--- Cycle finished in {round(time.monotonic() - cycle_start, 3)}s ---")
+            metrics.dump("./Live-Tools-V2/metrics/multi_bitget.prom")
+
+            # Entretien entre deux clôtures : marchés et levier de temps en temps (l'horloge est resynchronisée en tâche de fond)
+            try:
+                if time.monotonic() - markets_loaded_at > markets_reload_interval:
+                    pairs = await load_markets(market_exchange, exchanges, reload=True)
+                    markets_loaded_at = time.monotonic()
+                    if use_ws:
+                        await candles.subscribe(pairs, tf)
+                    await asyncio.gather(
+                        *[set_leverage(name, exchange, pairs) for name, exchange in exchanges.items()]
+                    )
+            except Exception as e:
+                print(f"Error during maintenance - Error => {str(e)}")
+    finally:
+        if use_ws:
+            await asyncio.gather(candles.close(), *[account_state.close() for account_state in account_states.values()])
+        await asyncio.gather(market_exchange.close(), *[exchange.close() for exchange in exchanges.values()])
+        await session_pool.close()
+        metrics.dump("./Live-Tools-V2/metrics/multi_bitget.prom")
 
 
+# python multi_bitget.py [--daemon [--ws]] [account ...]
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = sys.argv[1:]
+    if "--daemon" in args:
+        use_ws = "--ws" in args
+        args = [arg for arg in args if arg not in ["--daemon", "--ws"]]
+        asyncio.run(daemon(args, use_ws=use_ws))
+    else:
+        asyncio.run(main(args))
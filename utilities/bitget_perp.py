@@ -1,10 +1,82 @@
-from typing import List
+from typing import Dict, List
 import ccxt.async_support as ccxt
 import asyncio
 import pandas as pd
 import time
-import itertools
+import datetime
+import collections
+import uuid
+import random
+import decimal
+import hashlib
+import numpy as np
+import aiohttp
 from pydantic import BaseModel
+from utilities.ohlcv_store import OhlcvStore, OHLCV_COLUMNS, sort_unique_candles, candles_to_dataframe
+from utilities.markets_cache import read_markets_cache, write_markets_cache
+from utilities.request_metrics import RequestMetrics
+
+# Durée d'une bougie en millisecondes pour chaque timeframe Bitget (1M approximé à 31 jours pour le découpage des plages)
+TIMEFRAME_MS = {
+    "1m": 1 * 60 * 1000,
+    "3m": 3 * 60 * 1000,
+    "5m": 5 * 60 * 1000,
+    "15m": 15 * 60 * 1000,
+    "30m": 30 * 60 * 1000,
+    "1h": 60 * 60 * 1000,
+    "2h": 2 * 60 * 60 * 1000,
+    "4h": 4 * 60 * 60 * 1000,
+    "6h": 6 * 60 * 60 * 1000,
+    "12h": 12 * 60 * 60 * 1000,
+    "1d": 24 * 60 * 60 * 1000,
+    "3d": 3 * 24 * 60 * 60 * 1000,
+    "1w": 7 * 24 * 60 * 60 * 1000,
+    "1M": 31 * 24 * 60 * 60 * 1000,
+}
+
+# Limites des endpoints de bougies : 200 bougies par requête, 90 jours max par requête sur history-candles
+BITGET_OHLCV_LIMIT = 200
+BITGET_HISTORY_MAX_RANGE_MS = 90 * 24 * 60 * 60 * 1000
+
+# Durée couverte par une requête de bougies
+def ohlcv_chunk_ms(timeframe, history=False) -> int:
+    chunk_ms = BITGET_OHLCV_LIMIT * TIMEFRAME_MS[timeframe]
+    if history:
+        chunk_ms = min(chunk_ms, BITGET_HISTORY_MAX_RANGE_MS)
+    return chunk_ms
+
+# Bornes en ms (UTC) de la bougie en cours et de la suivante pour un timeframe
+# Les bougies hebdomadaires commencent le lundi, les mensuelles le 1er du mois, les autres sont alignées sur l'epoch
+def candle_boundaries(timeframe, ts) -> "CandleBoundaries":
+    if timeframe == "1M":
+        date = datetime.datetime.fromtimestamp(ts / 1000, tz=datetime.timezone.utc)
+        months = [date.year * 12 + date.month - 1 + i for i in range(3)]
+        opens = [
+            int(datetime.datetime(month // 12, month % 12 + 1, 1, tzinfo=datetime.timezone.utc).timestamp() * 1000)
+            for month in months
+        ]
+        return CandleBoundaries(open_ts=opens[0], close_ts=opens[1], next_close_ts=opens[2])
+    tf_ms = TIMEFRAME_MS[timeframe]
+    # 1970-01-01 est un jeudi : les semaines Bitget sont décalées de 4 jours
+    offset = 4 * TIMEFRAME_MS["1d"] if timeframe == "1w" else 0
+    open_ts = (ts - offset) // tf_ms * tf_ms + offset
+    return CandleBoundaries(open_ts=open_ts, close_ts=open_ts + tf_ms, next_close_ts=open_ts + 2 * tf_ms)
+
+# Clôtures (ms) des bougies ouvertes à open_ts (tableau), avec les mois calendaires de candle_boundaries pour 1M
+def candles_close_ts(timeframe, open_ts) -> np.ndarray:
+    open_ts = np.asarray(open_ts, dtype=np.int64)
+    if timeframe != "1M":
+        return open_ts + TIMEFRAME_MS[timeframe]
+    return np.array([candle_boundaries(timeframe, int(ts)).close_ts for ts in open_ts], dtype=np.int64)
+
+# Bougies (n, 6) triées qui suivent le dernier trou (bougie manquante), et si un trou a été trouvé
+def contiguous_tail(timeframe, candles):
+    if len(candles) < 2:
+        return candles, False
+    holes = np.nonzero(candles[1:, 0] != candles_close_ts(timeframe, candles[:-1, 0]))[0]
+    if len(holes) == 0:
+        return candles, False
+    return candles[holes[-1] + 1 :], True
 
 # Définition des modèles de données avec Pydantic
 class UsdtBalance(BaseModel):
@@ -12,6 +84,12 @@ class UsdtBalance(BaseModel):
     free: float
     used: float
 
+# Bougie en cours : ouverte à open_ts, close_ts est sa clôture (ouverture de la suivante), next_close_ts la clôture de la suivante
+class CandleBoundaries(BaseModel):
+    open_ts: int
+    close_ts: int
+    next_close_ts: int
+
 class Info(BaseModel):
     success: bool
     message: str
@@ -39,6 +117,29 @@ class TriggerOrder(BaseModel):
     reduce: bool
     timestamp: int
 
+# Stop loss / take profit attaché à une position : ferme toute la position au prix de marché au déclenchement
+# side est le côté de la position (long/short), type vaut stop_loss ou take_profit
+class PositionTpsl(BaseModel):
+    id: str
+    pair: str
+    side: str
+    type: str
+    trigger_price: float
+    timestamp: int
+
+class OpenOrdersSnapshot(BaseModel):
+    orders: Dict[str, List[Order]]
+    trigger_orders: Dict[str, List[TriggerOrder]]
+    position_tpsl: Dict[str, List[PositionTpsl]] = {}
+
+class Ticker(BaseModel):
+    pair: str
+    bid: float
+    ask: float
+    last: float
+    mark_price: float
+    timestamp: int
+
 class Position(BaseModel):
     pair: str
     side: str
@@ -55,34 +156,427 @@ class Position(BaseModel):
     take_profit_price: float
     stop_loss_price: float
 
+# Types d'ordres plan Bitget des TP/SL de position
+POSITION_TPSL_TYPES = {"pos_loss": "stop_loss", "pos_profit": "take_profit"}
+
+# Poids de chaque endpoint dans le seau à jetons, d'après les limites Bitget (20 req/s = poids 1, 10 req/s = poids 2, 5 req/s = poids 4)
+ENDPOINT_WEIGHTS = {
+    "load_markets": 1,
+    "fetch_time": 1,
+    "fetch_ohlcv": 1,
+    "publicMixGetV2MixMarketHistoryCandles": 1,
+    "fetch_tickers": 1,
+    "fetch_balance": 2,
+    "set_margin_mode": 4,
+    "set_leverage": 4,
+    "fetch_positions": 4,
+    "create_order": 2,
+    "create_orders": 4,
+    "create_trigger_order": 2,
+    "edit_order": 2,
+    "fetch_open_orders": 2,
+    "privateMixGetV2MixOrderOrdersPending": 2,
+    "privateMixGetV2MixOrderOrdersPlanPending": 2,
+    "fetch_order": 2,
+    "cancel_orders": 2,
+    "cancel_all_orders": 2,
+    "privateMixPostV2MixOrderBatchCancelOrders": 2,
+    "privateMixPostV2MixOrderCancelPlanOrder": 2,
+    "privateMixPostV2MixOrderPlaceTpslOrder": 2,
+    "privateMixPostV2MixOrderModifyTpslOrder": 2,
+}
+
+# Voies de priorité de l'ordonnanceur, de la plus prioritaire à la moins prioritaire
+# "protective" : ordres de fermeture (reduce only) et stop loss, qui passent toujours devant les nouvelles entrées
+REQUEST_LANES = ["protective", "default"]
+
+# Ordonnanceur de requêtes partagé : concurrence plafonnée, seau à jetons pondéré par endpoint,
+# voies de priorité et file équitable (round robin) entre les clés (paires) dans chaque voie
+class RequestScheduler:
+    def __init__(self, max_concurrency=10, rate=20, burst=20):
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._last_refill = time.monotonic()
+        self._queues = {lane: {} for lane in REQUEST_LANES}
+        self._running = 0
+        self._wakeup = None
+        self._dispatcher = None
+
+    # Mettre un appel en file dans une voie et attendre son résultat
+    async def submit(self, key, weight, func, *args, lane="default", **kwargs):
+        future = asyncio.get_running_loop().create_future()
+        self._queues[lane].setdefault(key, collections.deque()).append(
+            (weight, func, args, kwargs, future)
+        )
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        self._wakeup.set()
+        return await future
+
+    # Première voie non vide dans l'ordre de priorité, en écartant les requêtes annulées en tête de file
+    def _next_queues(self):
+        for lane in REQUEST_LANES:
+            queues = self._queues[lane]
+            for key in list(queues):
+                queue = queues[key]
+                while queue and queue[0][4].cancelled():
+                    queue.popleft()
+                if not queue:
+                    del queues[key]
+            if queues:
+                return queues
+        return None
+
+    # Prendre une requête par clé à tour de rôle dans la voie la plus prioritaire
+    # et la lancer dès qu'il y a des jetons et une place libre
+    # La requête n'est retirée de sa file qu'au lancement : une requête plus prioritaire arrivée pendant l'attente passe devant
+    async def _dispatch(self):
+        while True:
+            queues = self._next_queues()
+            if queues is None or self._running >= self.max_concurrency:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            key = next(iter(queues))
+            weight = queues[key][0][0]
+            self._refill_tokens()
+            if self._tokens < weight:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), (weight - self._tokens) / self.rate)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            queue = queues.pop(key)
+            weight, func, args, kwargs, future = queue.popleft()
+            if queue:
+                queues[key] = queue
+            self._tokens -= weight
+            self._running += 1
+            task = asyncio.create_task(self._run(func, args, kwargs, future))
+            # Une requête abandonnée en cours (timeout, couverture perdante) est annulée pour libérer sa place
+            future.add_done_callback(lambda future, task=task: task.cancel() if future.cancelled() else None)
+
+    def _refill_tokens(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    async def _run(self, func, args, kwargs, future):
+        try:
+            result = await func(*args, **kwargs)
+            if not future.cancelled():
+                future.set_result(result)
+        except Exception as e:
+            if not future.cancelled():
+                future.set_exception(e)
+        finally:
+            self._running -= 1
+            self._wakeup.set()
+
+# Pool de connexions partagé entre plusieurs PerpBitget (stratégies, comptes) d'un même processus :
+# une seule session aiohttp (connexions keep-alive, cache DNS) et une seule table de marchés chargée une fois
+# Chaque instance garde ses propres clés et signe ses requêtes
+# limit : nombre max de connexions ouvertes (0 = illimité), limit_per_host : idem par hôte
+class BitgetSessionPool:
+    def __init__(self, limit=100, limit_per_host=0, ttl_dns_cache=300, use_dns_cache=True, keepalive_timeout=30):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.use_dns_cache = use_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+        self._markets_exchange = None
+        self._markets_lock = asyncio.Lock()
+
+    # Session aiohttp partagée, créée au premier usage
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.ttl_dns_cache,
+                use_dns_cache=self.use_dns_cache,
+                keepalive_timeout=self.keepalive_timeout,
+                enable_cleanup_closed=True,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    # Créer un PerpBitget branché sur le pool (mêmes arguments que PerpBitget)
+    def create(self, **kwargs) -> "PerpBitget":
+        return PerpBitget(session_pool=self, **kwargs)
+
+    # Le premier appel (ou reload=True) charge les marchés, les suivants les reprennent sans requête
+    async def load_markets(self, exchange, reload=False):
+        async with self._markets_lock:
+            if reload or self._markets_exchange is None:
+                await exchange._load_markets(reload)
+                self._markets_exchange = exchange
+        if exchange is not self._markets_exchange:
+            exchange.load_markets_from(self._markets_exchange)
+
+    # À appeler après la fermeture des PerpBitget du pool
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
 # Classe pour l'interface avec l'API Bitget
+# session_pool : BitgetSessionPool à partager avec d'autres instances, sinon ccxt ouvre sa propre session
 class PerpBitget:
-    def __init__(self, public_api=None, secret_api=None, password=None):
+    def __init__(
+        self,
+        public_api=None,
+        secret_api=None,
+        password=None,
+        ohlcv_cache_dir=None,
+        markets_cache_path=None,
+        markets_cache_ttl=3600,
+        scheduler=None,
+        validate_models=True,
+        ohlcv_timeout=10,
+        ohlcv_retries=3,
+        ohlcv_backoff=0.5,
+        ohlcv_hedge_delay=None,
+        metrics=None,
+        api_url=None,
+        tickers_ttl=1,
+        time_sync_interval=600,
+        session_pool=None,
+    ):
         bitget_auth_object = {
             "apiKey": public_api,
             "secret": secret_api,
             "password": password,
-            "enableRateLimit": True,
-            "rateLimit": 100,
+            # Le débit est limité par l'ordonnanceur (voies de priorité) : la file FIFO de ccxt les annulerait
+            "enableRateLimit": False,
             "options": {
                 "defaultType": "future",
             },
         }
+        public_object = {"enableRateLimit": False}
+        # ccxt ne ferme pas une session qui lui est fournie : c'est le pool qui la ferme
+        if session_pool is not None:
+            bitget_auth_object["session"] = session_pool.session
+            public_object["session"] = session_pool.session
         if bitget_auth_object["secret"] == None:
             self._auth = False
-            self._session = ccxt.bitget()
+            self._session = ccxt.bitget(public_object)
         else:
             self._auth = True
             self._session = ccxt.bitget(bitget_auth_object)
+        self._session_pool = session_pool
+        # Rediriger toutes les requêtes vers une autre URL (Bitget local de utilities/mock_bitget.py)
+        if api_url is not None:
+            self._session.urls["api"] = {key: api_url for key in self._session.urls["api"]}
+        self._ohlcv_store = OhlcvStore(ohlcv_cache_dir) if ohlcv_cache_dir else None
+        self._markets_cache_path = markets_cache_path
+        self._markets_cache_ttl = markets_cache_ttl
+        self._markets_refresh_task = None
+        self._scheduler = scheduler if scheduler is not None else RequestScheduler()
+        self._validate_models = validate_models
+        self._ohlcv_timeout = ohlcv_timeout
+        self._ohlcv_retries = ohlcv_retries
+        self._ohlcv_backoff = ohlcv_backoff
+        self._ohlcv_hedge_delay = ohlcv_hedge_delay
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+        self._time_offset_ms = 0
+        self._time_sync_interval = time_sync_interval
+        self._time_sync_task = None
+        self._tickers_ttl = tickers_ttl
+        self._tickers = {}
+        self._tickers_time = 0
+        self._tickers_task = None
 
     # Charger les marchés disponibles
-    async def load_markets(self):
-        self.market = await self._session.load_markets()
+    # Avec un cache disque, les marchés sont servis depuis le fichier et rafraîchis en tâche de fond une fois le TTL dépassé
+    # Avec un pool de sessions, les marchés ne sont chargés qu'une fois pour toutes les instances du pool
+    async def load_markets(self, reload=False):
+        if self._session_pool is not None:
+            await self._session_pool.load_markets(self, reload)
+            return
+        await self._load_markets(reload)
+
+    async def _load_markets(self, reload=False):
+        cache = None
+        if self._markets_cache_path and not reload:
+            cache = read_markets_cache(self._markets_cache_path)
+        if cache is None:
+            await self._refresh_markets()
+            return
+        markets, currencies, age = cache
+        self._session.set_markets(markets, currencies)
+        self._set_market(self._session.markets)
+        if age > self._markets_cache_ttl:
+            self._markets_refresh_task = asyncio.create_task(self._background_refresh_markets())
+
+    # Recharger les marchés depuis Bitget et mettre à jour le cache
+    async def _refresh_markets(self):
+        self._set_market(await self._request("account", "load_markets", reload=True))
+        if self._markets_cache_path:
+            write_markets_cache(
+                self._markets_cache_path, self._session.markets, self._session.currencies
+            )
+
+    # Enregistrer les marchés et construire la table des pas de quantité et de prix
+    # Un pas est stocké en entiers (unités, décimales) : 0.005 -> (5, 3)
+    def _set_market(self, markets):
+        precision_table = {}
+        for pair, market in markets.items():
+            precision = market.get("precision") or {}
+            if precision.get("amount") and precision.get("price"):
+                precision_table[pair] = (
+                    self._tick_units(precision["amount"]),
+                    self._tick_units(precision["price"]),
+                )
+        self.market = markets
+        self._precision_table = precision_table
+
+    # Reprendre les marchés déjà chargés par un autre client (autre compte), sans requête ni lecture du cache
+    def load_markets_from(self, exchange):
+        self._session.set_markets(exchange._session.markets, exchange._session.currencies)
+        self.market = self._session.markets
+        self._precision_table = exchange._precision_table
+
+    def _tick_units(self, tick):
+        sign, digits, exponent = decimal.Decimal(str(tick)).normalize().as_tuple()
+        units = int("".join(str(digit) for digit in digits))
+        if exponent >= 0:
+            return units * 10**exponent, 0
+        return units, -exponent
+
+    async def _background_refresh_markets(self):
+        try:
+            await self._refresh_markets()
+        except Exception as e:
+            print(f"Error refreshing markets cache - Error => {str(e)}")
+
+    # Construire un modèle, sans validation pydantic si validate_models=False (les champs sont déjà typés et complets)
+    # model_construct est plus lent que la validation en pydantic 2, l'instance est donc remplie directement
+    def _build(self, model, fields):
+        if self._validate_models:
+            return model(**fields)
+        instance = model.__new__(model)
+        object.__setattr__(instance, "__dict__", fields)
+        object.__setattr__(instance, "__pydantic_fields_set__", set(fields))
+        object.__setattr__(instance, "__pydantic_extra__", None)
+        object.__setattr__(instance, "__pydantic_private__", None)
+        return instance
+
+    # Résultat d'une liste : modèles, ou DataFrame colonne par champ si columnar=True (sans créer de modèle)
+    def _to_result(self, model, rows, columnar):
+        if columnar:
+            return pd.DataFrame.from_records(rows, columns=list(model.model_fields))
+        return [self._build(model, row) for row in rows]
+
+    # Passer un appel ccxt par l'ordonnanceur partagé, la clé sert à répartir équitablement entre paires
+    # L'attente avant envoi et la durée de chaque appel sont enregistrées dans self.metrics
+    # call_timeout (secondes) borne l'appel lui-même, sans compter l'attente dans l'ordonnanceur
+    async def _request(self, key, endpoint, *args, lane="default", call_timeout=None, **kwargs):
+        result, _, _ = await self._timed_request(key, endpoint, *args, lane=lane, call_timeout=call_timeout, **kwargs)
+        return result
+
+    # Comme _request, en renvoyant aussi les heures (time.time()) de début et de fin de l'appel lui-même,
+    # sans l'attente dans l'ordonnanceur
+    async def _timed_request(self, key, endpoint, *args, lane="default", call_timeout=None, **kwargs):
+        func = getattr(self._session, endpoint)
+        submitted = time.monotonic()
+        started = None
+
+        # Mesurer l'attente dans l'ordonnanceur et la durée de l'appel
+        async def call():
+            nonlocal started
+            started = time.monotonic()
+            start = time.time()
+            result = await asyncio.wait_for(func(*args, **kwargs), call_timeout)
+            return result, start, time.time()
+
+        try:
+            result = await self._scheduler.submit(key, ENDPOINT_WEIGHTS.get(endpoint, 1), call, lane=lane)
+        except Exception as e:
+            if started is not None:
+                self.metrics.record(endpoint, started - submitted, time.monotonic() - started, e, lane=lane)
+            raise
+        self.metrics.record(endpoint, started - submitted, time.monotonic() - started, lane=lane)
+        return result
 
-    # Fermer la session
     async def close(self):
+        for task in [self._markets_refresh_task, self._time_sync_task]:
+            if task is not None and not task.done():
+                task.cancel()
         await self._session.close()
 
+    # Mesurer l'écart entre l'horloge locale et celle de Bitget (au milieu de l'aller-retour)
+    # Sur plusieurs mesures, celle à l'aller-retour le plus court est la plus précise
+    # L'aller-retour est celui de l'appel seul : l'attente dans l'ordonnanceur fausserait le milieu
+    async def sync_time(self, samples=3) -> int:
+        best_rtt = None
+        for _ in range(samples):
+            server_ms, start, end = await self._timed_request("account", "fetch_time")
+            if best_rtt is None or end - start < best_rtt:
+                best_rtt = end - start
+                self._time_offset_ms = int(server_ms - (start + end) / 2 * 1000)
+        return self._time_offset_ms
+
+    # Resynchroniser l'horloge en tâche de fond toutes les time_sync_interval secondes (dérive de l'horloge locale),
+    # après un premier sync_time
+    def start_time_sync(self):
+        if self._time_sync_task is None or self._time_sync_task.done():
+            self._time_sync_task = asyncio.create_task(self._periodic_time_sync())
+
+    async def _periodic_time_sync(self):
+        while True:
+            await asyncio.sleep(self._time_sync_interval)
+            try:
+                await self.sync_time()
+            except Exception as e:
+                print(f"Error while syncing server time - Error => {str(e)}")
+
+    # Bornes de la bougie en cours et de la suivante d'après l'heure du serveur
+    def candle_boundaries(self, timeframe) -> CandleBoundaries:
+        return candle_boundaries(timeframe, self.server_time_ms())
+
+    # Attendre, sur l'horloge du serveur, la clôture close_ts (par défaut celle de la bougie en cours) plus delay secondes
+    # L'attente est recalculée à chaque réveil pour suivre les resynchronisations de l'horloge
+    async def wait_candle_close(self, timeframe, delay=0, close_ts=None) -> int:
+        close_ts = self.candle_boundaries(timeframe).close_ts if close_ts is None else close_ts
+        while True:
+            remaining = (close_ts - self.server_time_ms()) / 1000 + delay
+            if remaining <= 0:
+                return close_ts
+            await asyncio.sleep(min(remaining, 60))
+
+    # Heure estimée du serveur Bitget en ms (heure locale tant que sync_time n'a pas été appelé)
+    def server_time_ms(self) -> int:
+        return int(time.time() * 1000) + self._time_offset_ms
+
+    # Arguments de connexion au websocket privé Bitget : signature HMAC-SHA256 (base64) de timestamp + "GET/user/verify"
+    def ws_login_args(self) -> dict:
+        timestamp = str(self.server_time_ms() // 1000)
+        sign = self._session.hmac(
+            self._session.encode(timestamp + "GET/user/verify"),
+            self._session.encode(self._session.secret),
+            hashlib.sha256,
+            "base64",
+        )
+        return {
+            "apiKey": self._session.apiKey,
+            "passphrase": self._session.password,
+            "timestamp": timestamp,
+            "sign": sign,
+        }
+
     # Convertir les paires d'échange
     def ext_pair_to_pair(self, ext_pair) -> str:
         return f"{ext_pair}:USDT"
@@ -90,6 +584,41 @@ class PerpBitget:
     def pair_to_ext_pair(self, pair) -> str:
         return pair.replace(":USDT", "")
     
+    # Prix de toutes les paires USDT-FUTURES en une seule requête, gardés en cache tickers_ttl secondes (ou max_age)
+    # Les appels simultanés partagent la même requête, le coût ne dépend pas du nombre de paires
+    async def get_tickers(self, pairs=None, max_age=None) -> Dict[str, Ticker]:
+        max_age = self._tickers_ttl if max_age is None else max_age
+        if time.monotonic() - self._tickers_time > max_age:
+            if self._tickers_task is None or self._tickers_task.done():
+                self._tickers_task = asyncio.ensure_future(self._refresh_tickers())
+            await asyncio.shield(self._tickers_task)
+        if pairs is None:
+            return dict(self._tickers)
+        return {pair: self._tickers[pair] for pair in pairs if pair in self._tickers}
+
+    async def _refresh_tickers(self):
+        resp = await self._request(
+            "account", "fetch_tickers", None, params={"type": "swap", "productType": "USDT-FUTURES"}
+        )
+        tickers = {}
+        for ticker in resp.values():
+            if not ticker["symbol"].endswith(":USDT"):
+                continue
+            pair = self.pair_to_ext_pair(ticker["symbol"])
+            tickers[pair] = self._build(
+                Ticker,
+                dict(
+                    pair=pair,
+                    bid=float(ticker["bid"] or 0),
+                    ask=float(ticker["ask"] or 0),
+                    last=float(ticker["last"] or 0),
+                    mark_price=float(ticker["info"].get("markPrice") or ticker["last"] or 0),
+                    timestamp=int(ticker["timestamp"] or 0),
+                ),
+            )
+        self._tickers = tickers
+        self._tickers_time = time.monotonic()
+
     # Obtenir les informations sur une paire
     def get_pair_info(self, ext_pair) -> str:
         pair = self.ext_pair_to_pair(ext_pair)
@@ -110,51 +639,218 @@ class PerpBitget:
         pair = self.ext_pair_to_pair(pair)
         return self._session.price_to_precision(pair, price)
 
-    # Obtenir les données OHLCV pour une paire donnée
-    async def get_last_ohlcv(self, pair, timeframe, limit=1000) -> pd.DataFrame:
-        pair = self.ext_pair_to_pair(pair)
-        bitget_limit = 200
-        ts_dict = {
-            "1m": 1 * 60 * 1000,
-            "5m": 5 * 60 * 1000,
-            "15m": 15 * 60 * 1000,
-            "1h": 60 * 60 * 1000,
-            "2h": 2 * 60 * 60 * 1000,
-            "4h": 4 * 60 * 60 * 1000,
-            "1d": 24 * 60 * 60 * 1000,
+    # Version tableau d'amount_to_precision / price_to_precision pour tout un plan d'ordres en une passe NumPy
+    # pairs est une paire ou une liste alignée sur les valeurs, le résultat est identique à ccxt
+    def amounts_to_precision(self, pairs, amounts) -> list:
+        return self._values_to_precision(pairs, amounts, 0, True, self.amount_to_precision)
+
+    def prices_to_precision(self, pairs, prices) -> list:
+        return self._values_to_precision(pairs, prices, 1, False, self.price_to_precision)
+
+    # Arrondi au pas (troncature pour les quantités, arrondi au plus proche pour les prix) calculé en flottants,
+    # les valeurs trop proches d'une frontière d'arrondi pour que le calcul flottant soit sûr repassent par ccxt
+    def _values_to_precision(self, pairs, values, kind, truncate, scalar_to_precision) -> list:
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        if isinstance(pairs, str):
+            pairs = [pairs] * len(values)
+        ticks = [self._precision_table.get(self.ext_pair_to_pair(pair)) for pair in pairs]
+        known = np.array([tick is not None for tick in ticks], dtype=bool)
+        units = np.array([tick[kind][0] if tick else 1 for tick in ticks], dtype=np.int64)
+        decimals = np.array([tick[kind][1] if tick else 0 for tick in ticks], dtype=np.int64)
+
+        steps = values * np.power(10.0, decimals) / units
+        tolerance = 1e-12 * np.maximum(np.abs(steps), 1)
+        if truncate:
+            count = np.floor(steps)
+            ambiguous = np.abs(steps - np.round(steps)) < tolerance
+        else:
+            count = np.floor(steps + 0.5)
+            ambiguous = np.abs(steps - np.floor(steps) - 0.5) < tolerance
+        valid = known & np.isfinite(steps) & (values > 0) & ~ambiguous & (count >= 1)
+        scaled = np.where(valid, count, 0).astype(np.int64) * units
+
+        results = []
+        for i in range(len(values)):
+            if not valid[i]:
+                results.append(scalar_to_precision(pairs[i], float(values[i])))
+                continue
+            digits = str(scaled[i])
+            if decimals[i] > 0:
+                digits = digits.rjust(decimals[i] + 1, "0")
+                digits = f"{digits[: -decimals[i]]}.{digits[-decimals[i] :]}".rstrip("0").rstrip(".")
+            results.append(digits)
+        return results
+
+    # Lancer une requête, doublée par une seconde identique si la première n'a pas répondu après hedge_delay secondes
+    # La première réponse réussie est gardée, l'autre requête est annulée
+    async def _hedged_request(self, hedge_delay, key, endpoint, *args, **kwargs):
+        tasks = {asyncio.ensure_future(self._request(key, endpoint, *args, **kwargs))}
+        try:
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done:
+                    tasks.add(asyncio.ensure_future(self._request(key, endpoint, *args, **kwargs)))
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # Requête history-candles d'une paire : pour les contrats, ccxt 4.2 retire params["method"] avant de choisir
+    # l'endpoint de fetch_ohlcv et interroge toujours candles, l'endpoint history-candles est donc appelé directement
+    def _history_candles_request(self, pair, timeframe, params) -> dict:
+        market = self._session.market(pair)
+        product_type, _ = self._session.handle_product_type_and_params(market, {})
+        return {
+            "symbol": market["id"],
+            "productType": product_type,
+            "granularity": self._session.options["timeframes"]["swap"].get(timeframe, timeframe),
+            **params,
         }
-        end_ts = int(time.time() * 1000)
-        start_ts = end_ts - ((limit) * ts_dict[timeframe])
+
+    # Télécharger une tranche de bougies avec timeout, et nouvelles tentatives espacées exponentiellement (avec gigue)
+    # Le timeout ne porte que sur l'appel HTTP, pas sur l'attente dans l'ordonnanceur
+    # Seules les erreurs réseau et les timeouts sont retentés
+    async def _fetch_ohlcv_chunk(self, pair, timeframe, params, history=False) -> list:
+        if history:
+            await self._session.load_markets()
+            request = self._history_candles_request(pair, timeframe, params)
+        for attempt in range(self._ohlcv_retries + 1):
+            try:
+                if not history:
+                    return await self._hedged_request(
+                        self._ohlcv_hedge_delay,
+                        pair,
+                        "fetch_ohlcv",
+                        pair,
+                        timeframe,
+                        params=params,
+                        call_timeout=self._ohlcv_timeout,
+                    )
+                resp = await self._hedged_request(
+                    self._ohlcv_hedge_delay,
+                    pair,
+                    "publicMixGetV2MixMarketHistoryCandles",
+                    request,
+                    call_timeout=self._ohlcv_timeout,
+                )
+                # Bitget répond "" (ou sans data) pour une fenêtre sans bougie
+                data = resp.get("data") if isinstance(resp, dict) else None
+                return self._session.parse_ohlcvs(data or [], self._session.market(pair), timeframe)
+            except (asyncio.TimeoutError, ccxt.NetworkError):
+                if attempt == self._ohlcv_retries:
+                    raise
+                await asyncio.sleep(self._ohlcv_backoff * 2**attempt * random.uniform(0.5, 1.5))
+
+    # Télécharger les bougies entre deux timestamps, par tranches de 200, dans un tableau (n, 6) préalloué
+    # history=True passe par l'endpoint history-candles, qui couvre tout l'historique de Bitget
+    # Renvoie aussi les tranches en échec : [{"start": ts, "end": ts, "error": message}]
+    async def _fetch_ohlcv_range(self, pair, timeframe, start_ts, end_ts, history=False):
+        chunk_ms = ohlcv_chunk_ms(timeframe, history)
         current_ts = start_ts
+        windows = []
         tasks = []
         while current_ts < end_ts:
-            req_end_ts = min(current_ts + (bitget_limit * ts_dict[timeframe]), end_ts)
-            tasks.append(
-                self._session.fetch_ohlcv(
-                    pair,
-                    timeframe,
-                    params={
-                        "limit": bitget_limit,
-                        "startTime": str(current_ts),
-                        "endTime": str(req_end_ts),
-                    },
+            # Fenêtre de chunk_ms - 1 ms bornes incluses : exactement 200 bougies au plus
+            req_end_ts = min(current_ts + chunk_ms - 1, end_ts)
+            params = {
+                "limit": BITGET_OHLCV_LIMIT,
+                "startTime": str(current_ts),
+                "endTime": str(req_end_ts),
+            }
+            windows.append((current_ts, req_end_ts))
+            tasks.append(self._fetch_ohlcv_chunk(pair, timeframe, params, history))
+            current_ts += chunk_ms
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        ohlcv_unpack = []
+        failed = []
+        for (window_start, window_end), result in zip(windows, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, Exception):
+                failed.append(
+                    {"start": window_start, "end": window_end, "error": f"{type(result).__name__} {result}".strip()}
                 )
-            )
-            current_ts += (bitget_limit * ts_dict[timeframe]) + 1
-        ohlcv_unpack = await asyncio.gather(*tasks)
-        ohlcv_list = list(itertools.chain.from_iterable(ohlcv_unpack))
-        df = pd.DataFrame(
-            ohlcv_list, columns=["date", "open", "high", "low", "close", "volume"]
+            # Une fenêtre où aucune bougie n'ouvre (ou avant la cotation) revient vide : rien à copier
+            elif len(result) > 0:
+                ohlcv_unpack.append(result)
+        candles = np.empty(
+            (sum(len(chunk) for chunk in ohlcv_unpack), len(OHLCV_COLUMNS)), dtype=np.float64
         )
-        df = df.set_index(df["date"])
-        df.index = pd.to_datetime(df.index, unit="ms")
-        df = df.sort_index()
-        del df["date"]
+        row = 0
+        for chunk in ohlcv_unpack:
+            candles[row : row + len(chunk)] = chunk
+            row += len(chunk)
+        return candles, failed
+
+    # Obtenir les bougies (n, 6) entre deux timestamps en ms, triées et sans doublons
+    # Une tranche en échec lève une exception : la plage renvoyée est toujours complète
+    async def get_ohlcv_range(self, pair, timeframe, start_ts, end_ts, history=False) -> np.ndarray:
+        pair = self.ext_pair_to_pair(pair)
+        candles, failed = await self._fetch_ohlcv_range(pair, timeframe, start_ts, end_ts, history)
+        if failed:
+            raise Exception(
+                f"Failed to fetch {len(failed)} ohlcv chunk(s) for {pair} {timeframe}: {failed[0]['error']}"
+            )
+        return sort_unique_candles(candles)
+
+    # Obtenir les données OHLCV pour une paire donnée
+    # Avec un cache disque, seules les bougies manquantes depuis la dernière bougie clôturée sont téléchargées
+    # Le cache reste contigu : après un arrêt plus long que la fenêtre il est vidé, et une fenêtre servie ne
+    # contient jamais de trou (une tranche en échec au milieu : seules les bougies après elle sont renvoyées)
+    # Les tranches en échec ne bloquent pas le résultat, elles sont listées dans df.attrs["failed_chunks"]
+    async def get_last_ohlcv(self, pair, timeframe, limit=1000) -> pd.DataFrame:
+        ext_pair = pair
+        pair = self.ext_pair_to_pair(pair)
+        tf_ms = TIMEFRAME_MS[timeframe]
+        end_ts = self.server_time_ms()
+        start_ts = end_ts - ((limit) * tf_ms)
+        cached = np.empty((0, len(OHLCV_COLUMNS)), dtype=np.float64)
+        if self._ohlcv_store is not None:
+            # Une paire cotée après le début de la fenêtre n'a pas de bougie avant sa cotation (launchTime)
+            listing_ts = (self.market.get(pair) or {}).get("created")
+            if listing_ts:
+                start_ts = max(start_ts, int(listing_ts))
+            boundaries = candle_boundaries(timeframe, start_ts)
+            first_open_ts = boundaries.open_ts if boundaries.open_ts >= start_ts else boundaries.close_ts
+            cached = self._ohlcv_store.read(ext_pair, timeframe)
+            stale = len(cached) > 0 and candle_boundaries(timeframe, int(cached[-1, 0])).close_ts < start_ts
+            cached = cached[cached[:, 0] >= start_ts]
+            _, hole = contiguous_tail(timeframe, cached)
+            # Cache arrêté avant la fenêtre (les bougies entre les deux ne seraient jamais téléchargées),
+            # troué, ou commençant après le début de la fenêtre (fenêtre agrandie) : il est vidé
+            # et toute la fenêtre est retéléchargée
+            if stale or hole or (len(cached) > 0 and cached[0, 0] > first_open_ts):
+                self._ohlcv_store.clear(ext_pair, timeframe)
+                cached = cached[:0]
+            if len(cached) > 0:
+                start_ts = candle_boundaries(timeframe, int(cached[-1, 0])).close_ts
+        fetched, failed = await self._fetch_ohlcv_range(pair, timeframe, start_ts, end_ts)
+        if failed and len(fetched) == 0 and len(cached) == 0:
+            raise Exception(f"Failed to fetch ohlcv for {pair} {timeframe}: {failed[0]['error']}")
+        if self._ohlcv_store is not None:
+            # Seules les bougies clôturées sont stockées, la bougie en cours est re-téléchargée
+            # et rien n'est stocké après une tranche en échec pour ne pas laisser de trou dans le cache
+            store_end_ts = min([end_ts] + [chunk["start"] for chunk in failed])
+            self._ohlcv_store.append(
+                ext_pair, timeframe, fetched[candles_close_ts(timeframe, fetched[:, 0]) <= store_end_ts]
+            )
+        # Les tranches se chevauchent à leurs bornes : tri et dédoublonnage vectorisés
+        candles = fetched if len(cached) == 0 else np.concatenate((cached, fetched))
+        candles, _ = contiguous_tail(timeframe, sort_unique_candles(candles))
+        df = candles_to_dataframe(candles)
+        df.attrs["failed_chunks"] = failed
         return df
 
     # Obtenir le solde USDT
     async def get_balance(self) -> UsdtBalance:
-        resp = await self._session.fetch_balance()
+        resp = await self._request("account", "fetch_balance")
         return UsdtBalance(
             total=resp["USDT"]["total"],
             free=resp["USDT"]["free"],
@@ -167,7 +863,9 @@ class PerpBitget:
             raise Exception("Margin mode must be either 'crossed' or 'isolated'")
         pair = self.ext_pair_to_pair(pair)
         try:
-            await self._session.set_margin_mode(
+            await self._request(
+                pair,
+                "set_margin_mode",
                 margin_mode,
                 pair,
                 params={"productType": "USDT-FUTURES", "marginCoin": "USDT"},
@@ -178,7 +876,9 @@ class PerpBitget:
             if margin_mode == "isolated":
                 tasks = []
                 tasks.append(
-                    self._session.set_leverage(
+                    self._request(
+                        pair,
+                        "set_leverage",
                         leverage,
                         pair,
                         params={
@@ -189,7 +889,9 @@ class PerpBitget:
                     )
                 )
                 tasks.append(
-                    self._session.set_leverage(
+                    self._request(
+                        pair,
+                        "set_leverage",
                         leverage,
                         pair,
                         params={
@@ -201,7 +903,9 @@ class PerpBitget:
                 )
                 await asyncio.gather(*tasks)
             else:
-                await self._session.set_leverage(
+                await self._request(
+                    pair,
+                    "set_leverage",
                     leverage,
                     pair,
                     params={"productType": "USDT-FUTURES", "marginCoin": "USDT"},
@@ -214,47 +918,37 @@ class PerpBitget:
             message=f"Margin mode and leverage set to {margin_mode} and {leverage}x",
         )
 
-    # Obtenir les positions ouvertes
-    async def get_open_positions(self, pairs) -> List[Position]:
-        pairs = [self.ext_pair_to_pair(pair) for pair in pairs]
-        resp = await self._session.fetch_positions(
+    # Convertir une position ccxt en champs de Position
+    def _position_fields(self, position) -> dict:
+        size = float(position["contracts"]) * float(position["contractSize"])
+        return dict(
+            pair=self.pair_to_ext_pair(position["symbol"]),
+            side=position["side"],
+            size=size,
+            usd_size=round(size * float(position["markPrice"]), 2),
+            entry_price=float(position["entryPrice"]),
+            current_price=float(position["markPrice"]),
+            unrealizedPnl=float(position["unrealizedPnl"]),
+            liquidation_price=float(position["liquidationPrice"] or 0),
+            leverage=float(position["leverage"]),
+            margin_mode=position["marginMode"],
+            hedge_mode=bool(position["hedged"]),
+            open_timestamp=int(position["timestamp"]),
+            take_profit_price=float(position["takeProfitPrice"] or 0),
+            stop_loss_price=float(position["stopLossPrice"] or 0),
+        )
+
+    # Obtenir les positions ouvertes (de toutes les paires si pairs=None)
+    async def get_open_positions(self, pairs, columnar=False) -> List[Position]:
+        if pairs is not None:
+            pairs = [self.ext_pair_to_pair(pair) for pair in pairs]
+        resp = await self._request(
+            "account",
+            "fetch_positions",
             symbols=pairs, params={"productType": "USDT-FUTURES", "marginCoin": "USDT"}
         )
-        return_positions = []
-        for position in resp:
-            liquidation_price = 0
-            take_profit_price = 0
-            stop_loss_price = 0
-            if position["liquidationPrice"]:
-                liquidation_price = position["liquidationPrice"]
-            if position["takeProfitPrice"]:
-                take_profit_price = position["takeProfitPrice"]
-            if position["stopLossPrice"]:
-                stop_loss_price = position["stopLossPrice"]
-
-            return_positions.append(
-                Position(
-                    pair=self.pair_to_ext_pair(position["symbol"]),
-                    side=position["side"],
-                    size=position["contracts"] * position["contractSize"],
-                    usd_size=round(
-                        (position["contracts"] * position["contractSize"])
-                        * position["markPrice"],
-                        2,
-                    ),
-                    entry_price=position["entryPrice"],
-                    current_price=position["markPrice"],
-                    unrealizedPnl=position["unrealizedPnl"],
-                    liquidation_price=liquidation_price,
-                    leverage=position["leverage"],
-                    margin_mode=position["marginMode"],
-                    hedge_mode=position["hedged"],
-                    open_timestamp=position["timestamp"],
-                    take_profit_price=take_profit_price,
-                    stop_loss_price=stop_loss_price,
-                )
-            )
-        return return_positions
+        rows = [self._position_fields(position) for position in resp]
+        return self._to_result(Position, rows, columnar)
 
     # Placer une commande
     async def place_order(
@@ -267,12 +961,17 @@ class PerpBitget:
         reduce=False,
         margin_mode="crossed",
         error=False,
+        hydrate=False,
     ) -> Order:
         try:
+            ext_pair = pair
             pair = self.ext_pair_to_pair(pair)
             trade_side = "Open" if reduce is False else "Close"
             margin_mode = "cross" if margin_mode == "crossed" else "isolated"
-            resp = await self._session.create_order(
+            resp = await self._request(
+                pair,
+                "create_order",
+                lane=self._order_lane(reduce),
                 symbol=pair,
                 type=type,
                 side=side,
@@ -284,10 +983,10 @@ class PerpBitget:
                     "marginMode": margin_mode,
                 },
             )
-            order_id = resp["id"]
-            pair = self.pair_to_ext_pair(resp["symbol"])
-            order = await self.get_order_by_id(order_id, pair)
-            return order
+            # Par défaut l'Order est construit depuis la réponse, hydrate=True relit son état sur Bitget
+            if hydrate:
+                return await self.get_order_by_id(resp["id"], ext_pair)
+            return self._order_from_request(resp["id"], ext_pair, type, side, price, size, reduce)
         except Exception as e:
             print(f"Error {type} {side} {size} {pair} - Price {price} - Error => {str(e)}")
             if error:
@@ -312,7 +1011,10 @@ class PerpBitget:
             pair = self.ext_pair_to_pair(pair)
             trade_side = "Open" if reduce is False else "Close"
             margin_mode = "cross" if margin_mode == "crossed" else "isolated"
-            trigger_order = await self._session.create_trigger_order(
+            trigger_order = await self._request(
+                pair,
+                "create_trigger_order",
+                lane=self._order_lane(reduce),
                 symbol=pair,
                 type=type,
                 side=side,
@@ -334,73 +1036,443 @@ class PerpBitget:
             else:
                 return None
 
-    # Obtenir les ordres ouverts
-    async def get_open_orders(self, pair) -> List[Order]:
-        pair = self.ext_pair_to_pair(pair)
-        resp = await self._session.fetch_open_orders(pair)
-        return_orders = []
-        for order in resp:
-            return_orders.append(
-                Order(
-                    id=order["id"],
-                    pair=self.pair_to_ext_pair(order["symbol"]),
-                    type=order["type"],
-                    side=order["side"],
-                    price=order["price"],
-                    size=order["amount"],
-                    reduce=order["reduceOnly"],
-                    filled=order["filled"],
-                    remaining=order["remaining"],
-                    timestamp=order["timestamp"],
+    # Modifier un ordre à déclenchement existant (prix, déclenchement, taille) sans l'annuler
+    async def edit_trigger_order(
+        self,
+        order_id,
+        pair,
+        side,
+        price,
+        trigger_price,
+        size,
+        type="limit",
+        reduce=False,
+        error=False,
+    ) -> Info:
+        try:
+            pair = self.ext_pair_to_pair(pair)
+            await self._request(
+                pair,
+                "edit_order",
+                order_id,
+                pair,
+                type,
+                side,
+                lane=self._order_lane(reduce),
+                amount=size,
+                price=price,
+                params={"triggerPrice": trigger_price},
+            )
+            return Info(success=True, message="Trigger Order modified")
+        except Exception as e:
+            print(f"Error edit {type} {side} {size} {pair} - Trigger {trigger_price} - Price {price} - Error => {str(e)}")
+            if error:
+                raise e
+            else:
+                return None
+
+    # Placer un stop loss (type="stop_loss") ou take profit (type="take_profit") sur la position pair / side (long, short)
+    # Il ferme toute la position au prix de marché, quelle que soit sa taille, et disparaît avec elle
+    async def place_position_tpsl(
+        self, pair, side, trigger_price, type="stop_loss", trigger_type="mark_price", error=False
+    ) -> Info:
+        try:
+            pair = self.ext_pair_to_pair(pair)
+            plan_type = "pos_loss" if type == "stop_loss" else "pos_profit"
+            await self._request(
+                pair,
+                "privateMixPostV2MixOrderPlaceTpslOrder",
+                {
+                    "symbol": self._session.market_id(pair),
+                    "productType": "USDT-FUTURES",
+                    "marginCoin": "USDT",
+                    "planType": plan_type,
+                    "triggerPrice": self._session.price_to_precision(pair, trigger_price),
+                    "triggerType": trigger_type,
+                    "executePrice": "0",
+                    "holdSide": side,
+                },
+                lane="protective",
+            )
+            return Info(success=True, message=f"Position {type} set up")
+        except Exception as e:
+            print(f"Error {type} {side} position {pair} - Trigger {trigger_price} - Error => {str(e)}")
+            if error:
+                raise e
+            else:
+                return None
+
+    # Déplacer le prix de déclenchement d'un TP/SL de position existant
+    async def edit_position_tpsl(self, order_id, pair, trigger_price, trigger_type="mark_price", error=False) -> Info:
+        try:
+            pair = self.ext_pair_to_pair(pair)
+            await self._request(
+                pair,
+                "privateMixPostV2MixOrderModifyTpslOrder",
+                {
+                    "orderId": order_id,
+                    "symbol": self._session.market_id(pair),
+                    "productType": "USDT-FUTURES",
+                    "marginCoin": "USDT",
+                    "triggerPrice": self._session.price_to_precision(pair, trigger_price),
+                    "triggerType": trigger_type,
+                    "executePrice": "0",
+                    "size": "",
+                },
+                lane="protective",
+            )
+            return Info(success=True, message="Position TP/SL modified")
+        except Exception as e:
+            print(f"Error edit position TP/SL {pair} - Trigger {trigger_price} - Error => {str(e)}")
+            if error:
+                raise e
+            else:
+                return None
+
+    # Mettre le stop loss et / ou le take profit d'une position aux prix voulus, sans requête s'ils n'ont pas changé
+    # current : TP/SL de position ouverts de la paire (snapshot.position_tpsl[pair]), relus si None
+    # Un TP/SL existant est modifié, sinon (ou si la modification est refusée) un nouveau est placé
+    # Renvoie les réponses des requêtes envoyées (liste vide si rien n'a changé)
+    async def set_position_tpsl(
+        self, pair, side, stop_loss_price=None, take_profit_price=None, current=None
+    ) -> List[Info]:
+        if current is None:
+            current = (await self.get_position_tpsl([pair]))[pair]
+        tasks = []
+        for type, price in [("stop_loss", stop_loss_price), ("take_profit", take_profit_price)]:
+            if price is None:
+                continue
+            price = float(self.price_to_precision(pair, price))
+            existing = next((tpsl for tpsl in current if tpsl.side == side and tpsl.type == type), None)
+            if existing is not None and existing.trigger_price == price:
+                continue
+            tasks.append(self._replace_position_tpsl(existing, pair, side, price, type))
+        return await asyncio.gather(*tasks)
+
+    async def _replace_position_tpsl(self, existing, pair, side, trigger_price, type) -> Info:
+        if existing is not None:
+            resp = await self.edit_position_tpsl(existing.id, pair, trigger_price)
+            if resp is not None:
+                return resp
+        return await self.place_position_tpsl(pair, side, trigger_price, type)
+
+    # Voie de l'ordonnanceur d'un ordre : les fermetures et stop loss (reduce only) passent devant les entrées
+    def _order_lane(self, reduce) -> str:
+        return "protective" if reduce else "default"
+
+    # Construire un Order à partir d'un ordre accepté par Bitget, sans requête supplémentaire
+    def _order_from_request(self, order_id, pair, type, side, price, size, reduce) -> Order:
+        return self._build(
+            Order,
+            dict(
+                id=order_id,
+                pair=pair,
+                type=type,
+                side=side,
+                price=float(price) if price else 0.0,
+                size=float(size),
+                reduce=bool(reduce),
+                filled=0.0,
+                remaining=float(size),
+                timestamp=int(time.time() * 1000),
+            ),
+        )
+
+    # Placer plusieurs ordres en les regroupant par paire sur l'endpoint batch de Bitget
+    # Les ordres reduce only forment des lots à part pour passer dans la voie prioritaire
+    # Chaque ordre est un dict avec les arguments de place_order, les résultats suivent l'ordre de la liste
+    async def place_orders_batch(self, orders, error=False) -> List[Order]:
+        if not self._session.has.get("createOrders"):
+            return await asyncio.gather(
+                *[self.place_order(**order, error=error) for order in orders]
+            )
+        bitget_batch_limit = 50
+        groups = {}
+        for index, order in enumerate(orders):
+            key = (order["pair"], order.get("margin_mode", "crossed"), order.get("reduce", False))
+            groups.setdefault(key, []).append(index)
+        results = [None] * len(orders)
+        tasks = []
+        for indexes in groups.values():
+            for i in range(0, len(indexes), bitget_batch_limit):
+                tasks.append(
+                    self._place_orders_chunk(
+                        orders, indexes[i : i + bitget_batch_limit], results, error
+                    )
                 )
+        await asyncio.gather(*tasks)
+        return results
+
+    async def _place_orders_chunk(self, orders, indexes, results, error):
+        ext_pair = orders[indexes[0]]["pair"]
+        pair = self.ext_pair_to_pair(ext_pair)
+        client_ids = {}
+        batch = []
+        for index in indexes:
+            order = orders[index]
+            reduce = order.get("reduce", False)
+            client_id = uuid.uuid4().hex
+            client_ids[client_id] = index
+            batch.append(
+                {
+                    "symbol": pair,
+                    "type": order.get("type", "limit"),
+                    "side": order["side"],
+                    "amount": order["size"],
+                    "price": order["price"],
+                    "params": {
+                        "reduceOnly": reduce,
+                        "tradeSide": "Open" if reduce is False else "Close",
+                        "marginMode": "cross" if order.get("margin_mode", "crossed") == "crossed" else "isolated",
+                        "clientOrderId": client_id,
+                    },
+                }
+            )
+        try:
+            resp = await self._request(
+                pair, "create_orders", batch, lane=self._order_lane(orders[indexes[0]].get("reduce", False))
+            )
+        except ccxt.NotSupported:
+            singles = await asyncio.gather(
+                *[self.place_order(**orders[index], error=error) for index in indexes]
             )
-        return return_orders
+            for index, order in zip(indexes, singles):
+                results[index] = order
+            return
+        except Exception as e:
+            print(f"Error batch of {len(batch)} orders {ext_pair} - Error => {str(e)}")
+            if error:
+                raise e
+            return
+        for created in resp:
+            index = client_ids.get(created["clientOrderId"])
+            if index is None:
+                continue
+            order = orders[index]
+            if created["status"] == "rejected":
+                message = created["info"].get("errorMsg")
+                print(f"Error {order.get('type', 'limit')} {order['side']} {order['size']} {ext_pair} - Price {order['price']} - Error => {message}")
+                if error:
+                    raise ccxt.InvalidOrder(message)
+                continue
+            results[index] = self._order_from_request(
+                created["id"],
+                ext_pair,
+                order.get("type", "limit"),
+                order["side"],
+                order["price"],
+                order["size"],
+                order.get("reduce", False),
+            )
+
+    # Placer plusieurs ordres à déclenchement
+    # Bitget n'a pas d'endpoint batch pour les ordres plan : envoi unitaire via l'ordonnanceur partagé
+    async def place_trigger_orders_batch(self, orders, error=False) -> List[Info]:
+        return await asyncio.gather(
+            *[self.place_trigger_order(**order, error=error) for order in orders]
+        )
+
+    # En mode hedge, Bitget renvoie le side de la position pour un ordre de fermeture (buy + close = fermer un long)
+    # ccxt l'inverse à la création : on le rétablit pour retrouver le side passé à place_order
+    def _order_side(self, order) -> str:
+        if (order["info"].get("tradeSide") or "").lower() == "close":
+            return "sell" if order["side"] == "buy" else "buy"
+        return order["side"]
+
+    # Convertir un ordre ccxt en champs d'Order
+    def _order_fields(self, order) -> dict:
+        return dict(
+            id=order["id"],
+            pair=self.pair_to_ext_pair(order["symbol"]),
+            type=order["type"],
+            side=self._order_side(order),
+            price=float(order["price"]),
+            size=float(order["amount"]),
+            reduce=bool(order["reduceOnly"]),
+            filled=float(order["filled"]),
+            remaining=float(order["remaining"]),
+            timestamp=int(order["timestamp"]),
+        )
+
+    # Convertir un ordre plan ccxt en champs de TriggerOrder
+    def _trigger_order_fields(self, order) -> dict:
+        reduce = True if order["info"]["tradeSide"] == "close" else False
+        price = order["price"] if order["price"] else 0.0
+        return dict(
+            id=order["id"],
+            pair=self.pair_to_ext_pair(order["symbol"]),
+            type=order["type"],
+            side=self._order_side(order),
+            price=float(price),
+            trigger_price=float(order["triggerPrice"]),
+            size=float(order["amount"]),
+            reduce=reduce,
+            timestamp=int(order["timestamp"]),
+        )
+
+    # Depuis l'ordre brut Bitget (info) et le symbole ccxt
+    def _position_tpsl_fields(self, info, symbol) -> dict:
+        return dict(
+            id=info["orderId"],
+            pair=self.pair_to_ext_pair(symbol),
+            side=info["posSide"],
+            type=POSITION_TPSL_TYPES[info["planType"]],
+            trigger_price=float(info["triggerPrice"]),
+            timestamp=int(info["cTime"]),
+        )
+
+    def _parse_order(self, order) -> Order:
+        return self._build(Order, self._order_fields(order))
+
+    def _parse_trigger_order(self, order) -> TriggerOrder:
+        return self._build(TriggerOrder, self._trigger_order_fields(order))
+
+    # Messages du websocket privé (canaux orders, orders-algo, positions, account) : les champs sont renommés
+    # comme en REST pour passer par les mêmes conversions ccxt et donner les mêmes modèles
+    def _ws_to_rest_fields(self, data) -> dict:
+        data = dict(data)
+        data["symbol"] = data.pop("instId", None)
+        if "ordType" in data:
+            data.setdefault("orderType", data.pop("ordType"))
+        if "accBaseVolume" in data:
+            data["baseVolume"] = data.pop("accBaseVolume")
+        return data
+
+    def parse_ws_order(self, data) -> Order:
+        data = self._ws_to_rest_fields(data)
+        market = self._session.safe_market(data["symbol"], None, None, "swap")
+        return self._parse_order(self._session.parse_order(data, market))
+
+    def parse_ws_trigger_order(self, data) -> TriggerOrder:
+        data = self._ws_to_rest_fields(data)
+        market = self._session.safe_market(data["symbol"], None, None, "swap")
+        return self._parse_trigger_order(self._session.parse_order(data, market))
+
+    def parse_ws_position_tpsl(self, data) -> PositionTpsl:
+        data = self._ws_to_rest_fields(data)
+        market = self._session.safe_market(data["symbol"], None, None, "swap")
+        return self._build(PositionTpsl, self._position_tpsl_fields(data, market["symbol"]))
+
+    # Sans markPrice dans le message, le prix de marque est retrouvé à partir du PnL latent
+    def parse_ws_position(self, data) -> Position:
+        data = self._ws_to_rest_fields(data)
+        if data.get("markPrice") is None:
+            size = float(data["total"])
+            entry_price = float(data["openPriceAvg"])
+            direction = 1 if data["holdSide"] == "long" else -1
+            unrealized_pnl = float(data.get("unrealizedPL") or 0)
+            data["markPrice"] = str(entry_price + direction * unrealized_pnl / size if size else entry_price)
+        market = self._session.safe_market(data["symbol"], None, None, "swap")
+        return self._build(Position, self._position_fields(self._session.parse_position(data, market)))
+
+    def parse_ws_balance(self, data) -> UsdtBalance:
+        data = dict(data)
+        data["accountEquity"] = data.get("equity")
+        balance = self._session.parse_balance([data])
+        return UsdtBalance(
+            total=balance["USDT"]["total"],
+            free=balance["USDT"]["free"],
+            used=balance["USDT"]["used"],
+        )
+
+    # Obtenir les ordres ouverts
+    async def get_open_orders(self, pair, columnar=False) -> List[Order]:
+        pair = self.ext_pair_to_pair(pair)
+        resp = await self._request(pair, "fetch_open_orders", pair)
+        rows = [self._order_fields(order) for order in resp]
+        return self._to_result(Order, rows, columnar)
 
     # Obtenir les ordres à déclenchement ouverts
-    async def get_open_trigger_orders(self, pair) -> List[TriggerOrder]:
+    async def get_open_trigger_orders(self, pair, columnar=False) -> List[TriggerOrder]:
         pair = self.ext_pair_to_pair(pair)
-        resp = await self._session.fetch_open_orders(pair, params={"stop": True})
-        return_orders = []
-        for order in resp:
-            reduce = True if order["info"]["tradeSide"] == "close" else False
-            price = order["price"] if order["price"] else 0.0
-            return_orders.append(
-                TriggerOrder(
-                    id=order["id"],
-                    pair=self.pair_to_ext_pair(order["symbol"]),
-                    type=order["type"],
-                    side=order["side"],
-                    price=price,
-                    trigger_price=order["triggerPrice"],
-                    size=order["amount"],
-                    reduce=reduce,
-                    timestamp=order["timestamp"],
-                )
-            )
-        return return_orders
+        resp = await self._request(
+            pair, "fetch_open_orders", pair, params={"stop": True}
+        )
+        rows = [self._trigger_order_fields(order) for order in resp]
+        return self._to_result(TriggerOrder, rows, columnar)
+
+    # Lire toutes les pages d'un endpoint d'ordres en attente de USDT-FUTURES (100 ordres par page)
+    async def _fetch_pending_pages(self, endpoint, params) -> list:
+        bitget_limit = 100
+        request = {"productType": "USDT-FUTURES", "limit": str(bitget_limit), **params}
+        orders = []
+        while True:
+            resp = await self._request("account", endpoint, request)
+            data = resp["data"] or {}
+            page = data.get("entrustedList") or []
+            orders += self._session.parse_orders(page)
+            if len(page) < bitget_limit or not data.get("endId"):
+                return orders
+            request["idLessThan"] = data["endId"]
+
+    # Obtenir en un seul passage les ordres ouverts et à déclenchement de toutes les paires, groupés par paire
+    # Le nombre de requêtes dépend du nombre d'ordres et non du nombre de paires
+    async def get_open_orders_snapshot(self, pairs=None) -> OpenOrdersSnapshot:
+        orders, trigger_orders, position_tpsl = await asyncio.gather(
+            self._fetch_pending_pages("privateMixGetV2MixOrderOrdersPending", {}),
+            self._fetch_pending_pages(
+                "privateMixGetV2MixOrderOrdersPlanPending", {"planType": "normal_plan"}
+            ),
+            self.get_position_tpsl(pairs),
+        )
+        snapshot = OpenOrdersSnapshot(
+            orders={pair: [] for pair in pairs or []},
+            trigger_orders={pair: [] for pair in pairs or []},
+            position_tpsl=position_tpsl,
+        )
+        for order in orders:
+            order = self._parse_order(order)
+            if pairs is None or order.pair in snapshot.orders:
+                snapshot.orders.setdefault(order.pair, []).append(order)
+        for order in trigger_orders:
+            order = self._parse_trigger_order(order)
+            if pairs is None or order.pair in snapshot.trigger_orders:
+                snapshot.trigger_orders.setdefault(order.pair, []).append(order)
+        return snapshot
+
+    # TP/SL de position ouverts, groupés par paire (une lecture pour tout le produit)
+    async def get_position_tpsl(self, pairs=None) -> Dict[str, List[PositionTpsl]]:
+        orders = await self._fetch_pending_pages(
+            "privateMixGetV2MixOrderOrdersPlanPending", {"planType": "profit_loss"}
+        )
+        position_tpsl = {pair: [] for pair in pairs or []}
+        for order in orders:
+            if order["info"].get("planType") not in POSITION_TPSL_TYPES:
+                continue
+            tpsl = self._build(PositionTpsl, self._position_tpsl_fields(order["info"], order["symbol"]))
+            if pairs is None or tpsl.pair in position_tpsl:
+                position_tpsl.setdefault(tpsl.pair, []).append(tpsl)
+        return position_tpsl
+
+    # Relire l'état de plusieurs ordres : un snapshot pour ceux encore ouverts, une requête par ordre sinon
+    async def hydrate_orders(self, orders) -> List[Order]:
+        orders = [order for order in orders if order is not None]
+        snapshot = await self.get_open_orders_snapshot(list({order.pair for order in orders}))
+        open_orders = {
+            order.id: order for pair_orders in snapshot.orders.values() for order in pair_orders
+        }
+        missing = [order for order in orders if order.id not in open_orders]
+        fetched = await asyncio.gather(
+            *[self.get_order_by_id(order.id, order.pair) for order in missing],
+            return_exceptions=True,
+        )
+        for order, resp in zip(missing, fetched):
+            open_orders[order.id] = order if isinstance(resp, Exception) else resp
+        return [open_orders[order.id] for order in orders]
 
     # Obtenir un ordre par son ID
     async def get_order_by_id(self, order_id, pair) -> Order:
         pair = self.ext_pair_to_pair(pair)
-        resp = await self._session.fetch_order(order_id, pair)
-        return Order(
-            id=resp["id"],
-            pair=self.pair_to_ext_pair(resp["symbol"]),
-            type=resp["type"],
-            side=resp["side"],
-            price=resp["price"],
-            size=resp["amount"],
-            reduce=resp["reduceOnly"],
-            filled=resp["filled"],
-            remaining=resp["remaining"],
-            timestamp=resp["timestamp"],
-        )
+        resp = await self._request(pair, "fetch_order", order_id, pair)
+        return self._parse_order(resp)
 
     # Annuler des ordres
     async def cancel_orders(self, pair, ids=[]):
         try:
             pair = self.ext_pair_to_pair(pair)
-            resp = await self._session.cancel_orders(
+            resp = await self._request(
+                pair,
+                "cancel_orders",
                 ids=ids,
                 symbol=pair,
             )
@@ -412,9 +1484,47 @@ class PerpBitget:
     async def cancel_trigger_orders(self, pair, ids=[]):
         try:
             pair = self.ext_pair_to_pair(pair)
-            resp = await self._session.cancel_orders(
-                ids=ids, symbol=pair, params={"stop": True}
+            resp = await self._request(
+                pair, "cancel_orders", ids=ids, symbol=pair, params={"stop": True}
             )
             return Info(success=True, message=f"{len(resp)} Trigger Orders cancelled")
         except Exception as e:
             return Info(success=False, message="Error or no orders to cancel")
+
+    # Annuler en masse les ordres normaux et à déclenchement des paires données, listés en un seul snapshot
+    # Une requête par paire et par type, ou deux requêtes pour tout le produit USDT-FUTURES si product_wide=True
+    # (ce qui annule aussi les ordres des paires hors liste)
+    # Renvoie par paire le nombre d'ordres d'ouverture (non reduce) annulés par côté
+    async def cancel_all_orders(self, pairs, product_wide=False) -> Dict[str, Dict[str, int]]:
+        snapshot = await self.get_open_orders_snapshot(pairs)
+        normal_orders = snapshot.orders
+        trigger_orders = snapshot.trigger_orders
+        counts = {pair: {"buy": 0, "sell": 0} for pair in pairs}
+        for pair in pairs:
+            for order in normal_orders[pair] + trigger_orders[pair]:
+                if order.reduce is False:
+                    counts[pair][order.side] += 1
+
+        tasks = []
+        if product_wide:
+            product_params = {"productType": "USDT-FUTURES", "marginCoin": "USDT"}
+            tasks.append(
+                self._request("account", "privateMixPostV2MixOrderBatchCancelOrders", product_params)
+            )
+            tasks.append(
+                self._request("account", "privateMixPostV2MixOrderCancelPlanOrder", product_params)
+            )
+        else:
+            for pair in pairs:
+                symbol = self.ext_pair_to_pair(pair)
+                if normal_orders[pair]:
+                    tasks.append(self._request(symbol, "cancel_all_orders", symbol))
+                if trigger_orders[pair]:
+                    tasks.append(
+                        self._request(symbol, "cancel_all_orders", symbol, params={"stop": True})
+                    )
+        resps = await asyncio.gather(*tasks, return_exceptions=True)
+        for resp in resps:
+            if isinstance(resp, Exception):
+                print(f"Error bulk cancel - Error => {str(resp)}")
+        return counts
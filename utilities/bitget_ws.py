@@ -0,0 +1,535 @@
+import asyncio
+import json
+import random
+import aiohttp
+import numpy as np
+import pandas as pd
+from utilities.bitget_perp import TIMEFRAME_MS, POSITION_TPSL_TYPES, Order, TriggerOrder, Position, OpenOrdersSnapshot
+from utilities.ohlcv_store import OHLCV_COLUMNS, sort_unique_candles, candles_to_dataframe
+
+BITGET_WS_PUBLIC_URL = "wss://ws.bitget.com/v2/ws/public"
+BITGET_WS_PRIVATE_URL = "wss://ws.bitget.com/v2/ws/private"
+PRODUCT_TYPE = "USDT-FUTURES"
+
+# Canal websocket des bougies Bitget pour chaque timeframe
+# À partir de 6h, les canaux *utc : bougies alignées sur UTC comme en REST (granularités ccxt) et dans candle_boundaries
+WS_CANDLE_CHANNELS = {
+    "1m": "candle1m",
+    "3m": "candle3m",
+    "5m": "candle5m",
+    "15m": "candle15m",
+    "30m": "candle30m",
+    "1h": "candle1H",
+    "2h": "candle2H",
+    "4h": "candle4H",
+    "6h": "candle6Hutc",
+    "12h": "candle12Hutc",
+    "1d": "candle1Dutc",
+    "3d": "candle3Dutc",
+    "1w": "candle1Wutc",
+    "1M": "candle1Mutc",
+}
+
+# Canaux du websocket privé tenus en cache, et statuts d'un ordre (normal ou plan) encore ouvert
+WS_ACCOUNT_CHANNELS = ["account", "positions", "orders", "orders-algo"]
+WS_OPEN_ORDER_STATUSES = ["live", "partially_filled"]
+
+
+# Liste de modèles, ou DataFrame colonne par champ si columnar=True (comme PerpBitget)
+def models_to_result(model, models, columnar):
+    if columnar:
+        return pd.DataFrame.from_records([item.__dict__ for item in models], columns=list(model.model_fields))
+    return models
+
+
+# Tampon circulaire de bougies de taille fixe : tableau (capacity, 6) préalloué, une ligne par timestamp
+class CandleRingBuffer:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.empty((capacity, len(OHLCV_COLUMNS)), dtype=np.float64)
+        self._start = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def last_timestamp(self):
+        if self._count == 0:
+            return None
+        return int(self._data[(self._start + self._count - 1) % self.capacity, 0])
+
+    # Ajouter ou mettre à jour une bougie : la bougie en cours est écrasée, une nouvelle bougie remplace la plus ancienne
+    def update(self, candle):
+        last_ts = self.last_timestamp()
+        if last_ts is None or candle[0] > last_ts:
+            index = (self._start + self._count) % self.capacity
+            if self._count == self.capacity:
+                self._start = (self._start + 1) % self.capacity
+            else:
+                self._count += 1
+            self._data[index] = candle
+        elif candle[0] == last_ts:
+            self._data[(self._start + self._count - 1) % self.capacity] = candle
+        else:
+            self.merge(candle.reshape(1, -1))
+
+    # Fusionner des bougies dans un ordre quelconque (instantané, rattrapage REST), elles remplacent celles du tampon
+    # Seules les capacity plus récentes sont gardées
+    def merge(self, candles):
+        merged = sort_unique_candles(np.concatenate((candles, self.to_array())))[-self.capacity :]
+        self._data[: len(merged)] = merged
+        self._start = 0
+        self._count = len(merged)
+
+    # Les limit dernières bougies (toutes par défaut) dans l'ordre chronologique, copiées
+    def to_array(self, limit=None) -> np.ndarray:
+        count = self._count if limit is None else min(limit, self._count)
+        indexes = (self._start + np.arange(self._count - count, self._count)) % self.capacity
+        return self._data[indexes]
+
+
+# Flux websocket des bougies Bitget (contrats USDT) pour plusieurs paires/timeframes
+# Chaque paire/timeframe a son tampon circulaire en mémoire, mis à jour à chaque message
+# Le REST (exchange.get_ohlcv_range) ne sert qu'à combler les trous : historique manquant au démarrage
+# et bougies perdues pendant une coupure ; les trous non comblés sont listés dans df.attrs["failed_chunks"]
+# Les canaux sont répartis par max_channels sur plusieurs connexions, reconnectées automatiquement
+class BitgetCandleStream:
+    def __init__(
+        self,
+        exchange,
+        url=BITGET_WS_PUBLIC_URL,
+        capacity=1000,
+        max_channels=50,
+        ping_interval=25,
+        reconnect_delay=1,
+        max_reconnect_delay=30,
+        ready_timeout=10,
+    ):
+        self.exchange = exchange
+        self.url = url
+        self.capacity = capacity
+        self.max_channels = max_channels
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.ready_timeout = ready_timeout
+        self._session = None
+        self._connections = []
+        self._channels = {}
+        self._buffers = {}
+        self._ready = {}
+        self._gaps = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    # S'abonner aux bougies d'un timeframe pour plusieurs paires (format "BTC/USDT")
+    async def subscribe(self, pairs, timeframe):
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        args = []
+        for pair in pairs:
+            key = (pair, timeframe)
+            if key in self._buffers:
+                continue
+            arg = {
+                "instType": PRODUCT_TYPE,
+                "channel": WS_CANDLE_CHANNELS[timeframe],
+                "instId": pair.split(":")[0].replace("/", ""),
+            }
+            self._channels[(arg["channel"], arg["instId"])] = key
+            self._buffers[key] = CandleRingBuffer(self.capacity)
+            self._ready[key] = asyncio.Event()
+            self._gaps[key] = []
+            args.append(arg)
+
+        # Compléter la dernière connexion puis en ouvrir de nouvelles
+        while args:
+            if not self._connections or len(self._connections[-1]["args"]) >= self.max_channels:
+                connection = {"args": [], "ws": None, "task": None}
+                self._connections.append(connection)
+            connection = self._connections[-1]
+            added = args[: self.max_channels - len(connection["args"])]
+            args = args[len(added) :]
+            connection["args"] += added
+            if connection["task"] is None:
+                connection["task"] = asyncio.create_task(self._run_connection(connection))
+            elif connection["ws"] is not None:
+                await connection["ws"].send_str(json.dumps({"op": "subscribe", "args": added}))
+
+    async def close(self):
+        for connection in self._connections:
+            if connection["task"] is not None:
+                connection["task"].cancel()
+        await asyncio.gather(
+            *[connection["task"] for connection in self._connections if connection["task"] is not None],
+            return_exceptions=True,
+        )
+        for gaps in self._gaps.values():
+            for gap in gaps:
+                gap["task"].cancel()
+        self._connections = []
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # Bougies en mémoire au même format que PerpBitget.get_last_ohlcv (au plus capacity bougies)
+    def get_ohlcv(self, pair, timeframe, limit=None) -> pd.DataFrame:
+        key = (pair, timeframe)
+        df = candles_to_dataframe(self._buffers[key].to_array(limit))
+        df.attrs["failed_chunks"] = [
+            {"start": gap["start"], "end": gap["end"], "error": gap["error"]} for gap in self._gaps[key]
+        ]
+        return df
+
+    # Remplaçant de PerpBitget.get_last_ohlcv : abonnement au premier appel, attente des premières bougies
+    # et des rattrapages en cours, les rattrapages en échec sont relancés
+    async def get_last_ohlcv(self, pair, timeframe, limit=1000) -> pd.DataFrame:
+        key = (pair, timeframe)
+        if key not in self._buffers:
+            await self.subscribe([pair], timeframe)
+        try:
+            await asyncio.wait_for(self._ready[key].wait(), self.ready_timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"No candle received for {pair} {timeframe} after {self.ready_timeout}s")
+        for gap in self._gaps[key]:
+            if gap["task"].done():
+                gap["task"] = asyncio.create_task(self._backfill(key, gap))
+        tasks = [gap["task"] for gap in self._gaps[key]]
+        if tasks:
+            await asyncio.wait(tasks)
+        return self.get_ohlcv(pair, timeframe, limit)
+
+    # Connexion websocket : abonnement à ses canaux, ping régulier, reconnexion avec attente croissante (et gigue)
+    async def _run_connection(self, connection):
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with self._session.ws_connect(self.url) as ws:
+                    await ws.send_str(json.dumps({"op": "subscribe", "args": connection["args"]}))
+                    connection["ws"] = ws
+                    delay = self.reconnect_delay
+                    ping_task = asyncio.create_task(self._ping(ws))
+                    try:
+                        async for message in ws:
+                            if message.type == aiohttp.WSMsgType.TEXT:
+                                self._on_message(message.data)
+                            elif message.type == aiohttp.WSMsgType.ERROR:
+                                break
+                    finally:
+                        connection["ws"] = None
+                        ping_task.cancel()
+                print("Candle websocket disconnected, reconnecting...")
+            except Exception as e:
+                print(f"Error on candle websocket - Error => {str(e)}")
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _ping(self, ws):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send_str("ping")
+
+    def _on_message(self, data):
+        if data == "pong":
+            return
+        message = json.loads(data)
+        if message.get("event") == "error":
+            print(f"Error on candle websocket - Error => {message.get('code')} {message.get('msg')}")
+            return
+        arg = message.get("arg", {})
+        key = self._channels.get((arg.get("channel"), arg.get("instId")))
+        if key is None or "event" in message or not message.get("data"):
+            return
+        # [ts, open, high, low, close, volume base, volume quote, volume usdt]
+        candles = np.array([row[: len(OHLCV_COLUMNS)] for row in message["data"]], dtype=np.float64)
+        self._on_candles(key, sort_unique_candles(candles))
+
+    # Repérer les trous avant d'intégrer les bougies reçues : historique manquant au premier message,
+    # bougies manquantes depuis la dernière reçue (cette dernière, peut-être incomplète, est relue aussi)
+    def _on_candles(self, key, candles):
+        buffer = self._buffers[key]
+        tf_ms = TIMEFRAME_MS[key[1]]
+        first_ts = int(candles[0, 0])
+        last_ts = buffer.last_timestamp()
+        if last_ts is None and len(candles) < self.capacity:
+            self._add_gap(key, first_ts - (self.capacity - len(candles)) * tf_ms, first_ts - 1)
+        elif last_ts is not None and first_ts > last_ts + tf_ms:
+            self._add_gap(key, last_ts, first_ts - 1)
+        if len(candles) == 1:
+            buffer.update(candles[0])
+        else:
+            buffer.merge(candles)
+        self._ready[key].set()
+
+    def _add_gap(self, key, start_ts, end_ts):
+        gap = {"start": start_ts, "end": end_ts, "error": "backfill in progress"}
+        gap["task"] = asyncio.create_task(self._backfill(key, gap))
+        self._gaps[key].append(gap)
+
+    # Combler un trou par REST, le trou reste listé (avec l'erreur) tant qu'il n'est pas comblé
+    async def _backfill(self, key, gap):
+        pair, timeframe = key
+        try:
+            candles = await self.exchange.get_ohlcv_range(pair, timeframe, gap["start"], gap["end"])
+            candles = candles[(candles[:, 0] >= gap["start"]) & (candles[:, 0] <= gap["end"])]
+            self._buffers[key].merge(candles)
+            self._gaps[key].remove(gap)
+        except Exception as e:
+            gap["error"] = str(e)
+            print(f"Error while backfilling {pair} {timeframe} candles - Error => {str(e)}")
+
+
+# État du compte tenu à jour par le websocket privé Bitget (solde, positions, ordres, ordres plan et TP/SL de position ouverts)
+# Les lectures ont la même signature que celles de PerpBitget et répondent depuis le cache sans requête REST ;
+# tant que le cache n'est pas synchronisé (démarrage, reconnexion) elles passent en REST par exchange
+# À chaque connexion, une fois les canaux souscrits, l'état complet est relu en REST puis les messages reçus
+# entre-temps sont rejoués : un message d'ordre n'est appliqué que s'il est plus récent (uTime) que la relecture
+# et que le dernier message appliqué pour cet ordre, pour ne pas faire revivre un ordre annulé
+class BitgetAccountStream:
+    def __init__(
+        self,
+        exchange,
+        url=BITGET_WS_PRIVATE_URL,
+        ping_interval=25,
+        reconnect_delay=1,
+        max_reconnect_delay=30,
+    ):
+        self.exchange = exchange
+        self.url = url
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.synced = False
+        self._synced_event = asyncio.Event()
+        self._session = None
+        self._task = None
+        self._resync_task = None
+        self._subscribed = set()
+        self._pending = []
+        self._seed_ts = 0
+        self._versions = {}
+        self._balance = None
+        self._positions = {}
+        self._orders = {}
+        self._trigger_orders = {}
+        self._position_tpsl = {}
+
+    async def start(self):
+        if self._task is None:
+            self._session = aiohttp.ClientSession()
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def close(self):
+        for task in [self._task, self._resync_task]:
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(
+            *[task for task in [self._task, self._resync_task] if task is not None], return_exceptions=True
+        )
+        self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    # Attendre que le cache soit synchronisé, renvoie False après timeout secondes
+    async def wait_synced(self, timeout=None) -> bool:
+        try:
+            await asyncio.wait_for(self._synced_event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def get_balance(self):
+        if not self.synced:
+            return await self.exchange.get_balance()
+        return self._balance
+
+    async def get_open_positions(self, pairs, columnar=False):
+        if not self.synced:
+            return await self.exchange.get_open_positions(pairs, columnar)
+        positions = [
+            position for position in self._positions.values() if pairs is None or position.pair in pairs
+        ]
+        return models_to_result(Position, positions, columnar)
+
+    async def get_open_orders(self, pair, columnar=False):
+        if not self.synced:
+            return await self.exchange.get_open_orders(pair, columnar)
+        orders = [order for order in self._orders.values() if order.pair == pair]
+        return models_to_result(Order, orders, columnar)
+
+    async def get_open_trigger_orders(self, pair, columnar=False):
+        if not self.synced:
+            return await self.exchange.get_open_trigger_orders(pair, columnar)
+        orders = [order for order in self._trigger_orders.values() if order.pair == pair]
+        return models_to_result(TriggerOrder, orders, columnar)
+
+    async def get_open_orders_snapshot(self, pairs=None) -> OpenOrdersSnapshot:
+        if not self.synced:
+            return await self.exchange.get_open_orders_snapshot(pairs)
+        snapshot = OpenOrdersSnapshot(
+            orders={pair: [] for pair in pairs or []},
+            trigger_orders={pair: [] for pair in pairs or []},
+            position_tpsl={pair: [] for pair in pairs or []},
+        )
+        for order in self._orders.values():
+            if pairs is None or order.pair in snapshot.orders:
+                snapshot.orders.setdefault(order.pair, []).append(order)
+        for order in self._trigger_orders.values():
+            if pairs is None or order.pair in snapshot.trigger_orders:
+                snapshot.trigger_orders.setdefault(order.pair, []).append(order)
+        for tpsl in self._position_tpsl.values():
+            if pairs is None or tpsl.pair in snapshot.position_tpsl:
+                snapshot.position_tpsl.setdefault(tpsl.pair, []).append(tpsl)
+        return snapshot
+
+    # Connexion : login, abonnement aux canaux après le login, ping régulier, reconnexion avec attente croissante
+    async def _run(self):
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with self._session.ws_connect(self.url) as ws:
+                    await ws.send_str(json.dumps({"op": "login", "args": [self.exchange.ws_login_args()]}))
+                    ping_task = asyncio.create_task(self._ping(ws))
+                    try:
+                        async for message in ws:
+                            if message.type == aiohttp.WSMsgType.TEXT:
+                                await self._on_message(ws, message.data)
+                                delay = self.reconnect_delay if self.synced else delay
+                            elif message.type == aiohttp.WSMsgType.ERROR:
+                                break
+                    finally:
+                        ping_task.cancel()
+                        self._disconnected()
+                print("Account websocket disconnected, reconnecting...")
+            except Exception as e:
+                self._disconnected()
+                print(f"Error on account websocket - Error => {str(e)}")
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _ping(self, ws):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send_str("ping")
+
+    # Le cache n'est plus tenu à jour : les lectures repassent en REST jusqu'à la prochaine synchronisation
+    def _disconnected(self):
+        self.synced = False
+        self._synced_event.clear()
+        self._subscribed = set()
+        self._pending = []
+        if self._resync_task is not None:
+            self._resync_task.cancel()
+            self._resync_task = None
+
+    async def _on_message(self, ws, data):
+        if data == "pong":
+            return
+        message = json.loads(data)
+        event = message.get("event")
+        if event == "login":
+            args = [
+                {"instType": PRODUCT_TYPE, "channel": channel, "coin" if channel == "account" else "instId": "default"}
+                for channel in WS_ACCOUNT_CHANNELS
+            ]
+            await ws.send_str(json.dumps({"op": "subscribe", "args": args}))
+        elif event == "subscribe":
+            self._subscribed.add(message["arg"]["channel"])
+            # Relecture REST seulement une fois tous les canaux actifs, pour ne perdre aucun message
+            if self._resync_task is None and self._subscribed.issuperset(WS_ACCOUNT_CHANNELS):
+                self._resync_task = asyncio.create_task(self._resync())
+        elif event == "error":
+            print(f"Error on account websocket - Error => {message.get('code')} {message.get('msg')}")
+        elif event is None and "arg" in message:
+            if self.synced:
+                self._apply(message)
+            else:
+                self._pending.append(message)
+
+    # Relire tout l'état en REST, puis rejouer les messages reçus pendant la relecture
+    async def _resync(self):
+        while True:
+            try:
+                seed_ts = self.exchange.server_time_ms()
+                balance, snapshot, positions = await asyncio.gather(
+                    self.exchange.get_balance(),
+                    self.exchange.get_open_orders_snapshot(),
+                    self.exchange.get_open_positions(None),
+                )
+                break
+            except Exception as e:
+                print(f"Error while syncing account state - Error => {str(e)}")
+                await asyncio.sleep(self.reconnect_delay)
+        self._seed_ts = seed_ts
+        self._versions = {}
+        self._balance = balance
+        self._positions = {(position.pair, position.side): position for position in positions}
+        self._orders = {order.id: order for orders in snapshot.orders.values() for order in orders}
+        self._trigger_orders = {
+            order.id: order for orders in snapshot.trigger_orders.values() for order in orders
+        }
+        self._position_tpsl = {
+            tpsl.id: tpsl for position_tpsl in snapshot.position_tpsl.values() for tpsl in position_tpsl
+        }
+        for message in self._pending:
+            if message["arg"]["channel"] in ["account", "positions"] and int(message.get("ts", 0)) < seed_ts:
+                continue
+            self._apply(message)
+        self._pending = []
+        self.synced = True
+        self._synced_event.set()
+
+    def _apply(self, message):
+        channel = message["arg"]["channel"]
+        data = message.get("data") or []
+        if channel == "account":
+            for entry in data:
+                if entry.get("marginCoin") == "USDT":
+                    self._balance = self.exchange.parse_ws_balance(entry)
+        elif channel == "positions":
+            # Un instantané contient toutes les positions ouvertes, une mise à jour seulement celles qui changent
+            positions = {} if message.get("action") == "snapshot" else dict(self._positions)
+            for entry in data:
+                position = self.exchange.parse_ws_position(entry)
+                if position.size > 0:
+                    positions[(position.pair, position.side)] = position
+                else:
+                    positions.pop((position.pair, position.side), None)
+            self._positions = positions
+        elif channel in ["orders", "orders-algo"]:
+            trigger = channel == "orders-algo"
+            for entry in data:
+                # Ordres plan suivis comme dans get_open_orders_snapshot : ordres plan classiques et TP/SL de position
+                plan_type = entry.get("planType", "normal_plan") if trigger else None
+                if trigger and plan_type != "normal_plan" and plan_type not in POSITION_TPSL_TYPES:
+                    continue
+                if plan_type in POSITION_TPSL_TYPES:
+                    orders, parse = self._position_tpsl, self.exchange.parse_ws_position_tpsl
+                elif trigger:
+                    orders, parse = self._trigger_orders, self.exchange.parse_ws_trigger_order
+                else:
+                    orders, parse = self._orders, self.exchange.parse_ws_order
+                order_id = entry["orderId"]
+                updated = int(entry.get("uTime") or entry.get("cTime") or 0)
+                is_open = entry.get("status") in WS_OPEN_ORDER_STATUSES
+                # À uTime égal, un ordre déjà fermé ne redevient pas ouvert
+                version, was_open = self._versions.get(order_id, (0, True))
+                if updated < max(version, self._seed_ts) or (updated == version and not was_open):
+                    continue
+                self._versions[order_id] = (updated, is_open)
+                if is_open:
+                    orders[order_id] = parse(entry)
+                else:
+                    orders.pop(order_id, None)
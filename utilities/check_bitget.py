@@ -0,0 +1,241 @@
+import asyncio
+import sys
+import numpy as np
+from utilities.mock_bitget import MockBitget, DEFAULT_CONTRACTS
+from utilities.bitget_perp import PerpBitget, RequestScheduler, Order, TriggerOrder, OpenOrdersSnapshot
+from utilities.order_reconciler import OrderReconciler
+
+# Vérifications de non-régression de PerpBitget sur le Bitget local (utilities/mock_bitget.py), sans clés ni réseau :
+# - arrondi vectorisé (amounts_to_precision / prices_to_precision) identique à ccxt sur tous les marchés chargés
+# - plans de l'OrderReconciler : ordres gardés, modifiés, annulés, placés
+# - priorité de la voie "protective" de l'ordonnanceur sur la voie "default"
+# Lancement depuis la racine du dépôt : python -m utilities.check_bitget [cache_des_marchés.json]
+# Avec un cache des marchés (écrit par PerpBitget(markets_cache_path=...)), l'arrondi est aussi vérifié sur ses marchés
+
+# Contrats ajoutés à ceux du mock pour couvrir plus de pas de prix et de quantité
+CHECK_CONTRACTS = {
+    **DEFAULT_CONTRACTS,
+    "PEPE": {"price": 0.0000123, "pricePlace": 8, "priceEndStep": 1, "volumePlace": 0, "minTradeNum": "100"},
+    "XRP": {"price": 0.6, "pricePlace": 4, "priceEndStep": 5, "volumePlace": 0, "minTradeNum": "10"},
+    "BNB": {"price": 550, "pricePlace": 2, "priceEndStep": 5, "volumePlace": 2, "minTradeNum": "0.01"},
+    "YFI": {"price": 7000, "pricePlace": 0, "priceEndStep": 1, "volumePlace": 4, "minTradeNum": "0.0001"},
+}
+
+
+class Checks:
+    def __init__(self):
+        self.failures = []
+        self.count = 0
+
+    def check(self, name, condition, detail=""):
+        self.count += 1
+        if not condition:
+            self.failures.append(name)
+            print(f"FAIL {name} {detail}")
+
+
+# Comparer amounts_to_precision / prices_to_precision à ccxt, valeur par valeur, sur tous les marchés du client
+# Les valeurs couvrent plusieurs ordres de grandeur autour du prix, les multiples exacts du pas et les demi-pas
+def check_precision(checks, exchange, label, samples=200, seed=0):
+    random = np.random.default_rng(seed)
+    symbols = [symbol for symbol in exchange.market if symbol in exchange._precision_table]
+    for symbol in symbols:
+        market = exchange.market[symbol]
+        pair = exchange.pair_to_ext_pair(symbol)
+        price = float((market.get("info") or {}).get("price") or 0) or 1.0
+        amount_tick = float(market["precision"]["amount"])
+        price_tick = float(market["precision"]["price"])
+        prices = np.concatenate(
+            [
+                price * random.uniform(0.5, 1.5, samples),
+                price_tick * random.integers(1, 10**6, samples),
+                price_tick * (random.integers(1, 10**6, samples) + 0.5),
+            ]
+        )
+        amounts = np.concatenate(
+            [
+                10 ** random.uniform(-2, 4, samples) * amount_tick * 100,
+                amount_tick * random.integers(1, 10**6, samples),
+                amount_tick * (random.integers(1, 10**6, samples) + 0.5),
+            ]
+        )
+        vector_prices = exchange.prices_to_precision(pair, prices)
+        vector_amounts = exchange.amounts_to_precision(pair, amounts)
+        bad_prices = [
+            (value, result)
+            for value, result in zip(prices, vector_prices)
+            if str(result) != str(exchange.price_to_precision(pair, float(value)))
+        ]
+        bad_amounts = [
+            (value, result)
+            for value, result in zip(amounts, vector_amounts)
+            if str(result) != str(exchange.amount_to_precision(pair, float(value)))
+        ]
+        checks.check(f"precision {label} {pair} prices", not bad_prices, bad_prices[:3])
+        checks.check(f"precision {label} {pair} amounts", not bad_amounts, bad_amounts[:3])
+    print(f"precision {label}: {len(symbols)} markets checked")
+
+
+def _order(pair, side, price, size, reduce=False, id="1"):
+    return Order(
+        id=id, pair=pair, type="limit", side=side, price=price, size=size,
+        reduce=reduce, filled=0, remaining=size, timestamp=0,
+    )
+
+
+def _trigger_order(pair, side, price, trigger_price, size, reduce=False, id="2"):
+    return TriggerOrder(
+        id=id, pair=pair, type="limit", side=side, price=price, trigger_price=trigger_price,
+        size=size, reduce=reduce, timestamp=0,
+    )
+
+
+def _snapshot(orders=[], trigger_orders=[]):
+    snapshot = OpenOrdersSnapshot(orders={}, trigger_orders={})
+    for order in orders:
+        snapshot.orders.setdefault(order.pair, []).append(order)
+    for order in trigger_orders:
+        snapshot.trigger_orders.setdefault(order.pair, []).append(order)
+    return snapshot
+
+
+# Plans attendus de OrderReconciler.diff pour chaque cas : (kept, amend, cancel, place) tous types confondus
+def check_reconciler_diff(checks, exchange):
+    reconciler = OrderReconciler(exchange)
+    entry = dict(pair="ETH/USDT", side="buy", price=2900, size=1.0)
+    trigger_entry = dict(pair="ETH/USDT", side="buy", price=3100, trigger_price=3090, size=1.0)
+    # BTC a 3 décimales de quantité : 1.005 reste dans size_tolerance mais n'est pas la taille exacte
+    close = dict(pair="BTC/USDT", side="sell", price=65000, size=1.0, reduce=True)
+    cases = [
+        ("keep identical order", [entry], _snapshot([_order("ETH/USDT", "buy", 2900, 1.0)]), (1, 0, 0, 0)),
+        ("keep entry within tolerance", [entry], _snapshot([_order("ETH/USDT", "buy", 2900.5, 1.005)]), (1, 0, 0, 0)),
+        ("replace moved order", [entry], _snapshot([_order("ETH/USDT", "buy", 2800, 1.0)]), (0, 0, 1, 1)),
+        ("place missing order", [entry], _snapshot(), (0, 0, 0, 1)),
+        ("cancel unwanted order", [], _snapshot([_order("ETH/USDT", "buy", 2900, 1.0)]), (0, 0, 1, 0)),
+        ("cancel order on the other side", [entry], _snapshot([_order("ETH/USDT", "sell", 2900, 1.0)]), (0, 0, 1, 1)),
+        (
+            "keep identical trigger order",
+            [trigger_entry],
+            _snapshot(trigger_orders=[_trigger_order("ETH/USDT", "buy", 3100, 3090, 1.0)]),
+            (1, 0, 0, 0),
+        ),
+        (
+            "amend moved trigger order",
+            [trigger_entry],
+            _snapshot(trigger_orders=[_trigger_order("ETH/USDT", "buy", 3150, 3140, 1.0)]),
+            (0, 1, 0, 0),
+        ),
+        (
+            "cancel unwanted trigger order",
+            [],
+            _snapshot(trigger_orders=[_trigger_order("ETH/USDT", "buy", 3100, 3090, 1.0)]),
+            (0, 0, 1, 0),
+        ),
+        ("place missing trigger order", [trigger_entry], _snapshot(), (0, 0, 0, 1)),
+        ("keep exact reduce order", [close], _snapshot([_order("BTC/USDT", "sell", 65000, 1.0, True)]), (1, 0, 0, 0)),
+        (
+            "replace reduce order of another size",
+            [close],
+            _snapshot([_order("BTC/USDT", "sell", 65000, 1.005, True)]),
+            (0, 0, 1, 1),
+        ),
+        (
+            "keep entry of a size within tolerance",
+            [dict(close, reduce=False)],
+            _snapshot([_order("BTC/USDT", "sell", 65000, 1.005)]),
+            (1, 0, 0, 0),
+        ),
+    ]
+    for name, desired, snapshot, expected in cases:
+        plan = reconciler.diff(desired, snapshot)
+        result = (
+            plan.kept,
+            len(plan.amend_trigger_orders),
+            len(plan.cancel_orders) + len(plan.cancel_trigger_orders),
+            len(plan.place_orders) + len(plan.place_trigger_orders),
+        )
+        checks.check(f"reconciler {name}", result == expected, f"{result} != {expected}")
+
+
+# Bout en bout sur le mock : un carnet appliqué puis relu ne demande plus aucune action,
+# y compris pour un ordre de fermeture (side rétabli par _order_side en mode hedge)
+async def check_reconciler_roundtrip(checks, exchange):
+    reconciler = OrderReconciler(exchange)
+    await exchange.place_order("ETH/USDT", "buy", None, 1.0, type="market")
+    desired = [
+        dict(pair="ETH/USDT", side="buy", price=2500, size=0.5),
+        dict(pair="ETH/USDT", side="sell", price=3500, size=1.0, reduce=True),
+        dict(pair="ETH/USDT", side="buy", price=3600, trigger_price=3590, size=0.5),
+        dict(pair="ETH/USDT", side="sell", price=2000, trigger_price=2010, size=1.0, reduce=True),
+    ]
+    first = await reconciler.reconcile(desired, ["ETH/USDT"])
+    second = await reconciler.reconcile(desired, ["ETH/USDT"])
+    checks.check("reconciler roundtrip places the book", len(first.place_orders) + len(first.place_trigger_orders) == 4)
+    checks.check(
+        "reconciler roundtrip keeps the book",
+        second.kept == 4 and not (second.place_orders or second.place_trigger_orders
+                                  or second.cancel_orders or second.cancel_trigger_orders
+                                  or second.amend_trigger_orders),
+        second,
+    )
+    moved = [dict(order, price=order["price"] + 10) if "trigger_price" in order else order for order in desired]
+    moved = [dict(order, trigger_price=order["trigger_price"] + 10) if "trigger_price" in order else order for order in moved]
+    third = await reconciler.reconcile(moved, ["ETH/USDT"])
+    checks.check("reconciler roundtrip amends trigger orders", len(third.amend_trigger_orders) == 2 and third.kept == 2, third)
+
+
+# Avec une seule requête à la fois, les requêtes "protective" envoyées pendant que la voie "default" est saturée
+# doivent toutes partir avant les requêtes "default" encore en file
+async def check_scheduler_lanes(checks):
+    scheduler = RequestScheduler(max_concurrency=1, rate=1000, burst=1000)
+    started = []
+
+    def job(name):
+        async def call():
+            started.append(name)
+            await asyncio.sleep(0.01)
+        return call
+
+    entries = [asyncio.create_task(scheduler.submit(f"P{i % 3}", 1, job(f"default{i}"))) for i in range(6)]
+    await asyncio.sleep(0.005)
+    protective = [
+        asyncio.create_task(scheduler.submit(f"P{i}", 1, job(f"protective{i}"), lane="protective")) for i in range(3)
+    ]
+    await asyncio.gather(*entries, *protective)
+    protective_ranks = [started.index(f"protective{i}") for i in range(3)]
+    waiting_ranks = [started.index(name) for name in started if name.startswith("default")][1:]
+    checks.check(
+        "scheduler protective lane first",
+        max(protective_ranks) < min(waiting_ranks),
+        started,
+    )
+
+
+async def main(markets_cache_path=None):
+    checks = Checks()
+    async with MockBitget(contracts=CHECK_CONTRACTS) as mock:
+        exchange = PerpBitget(api_url=mock.url)
+        await exchange.load_markets()
+        check_precision(checks, exchange, "mock")
+        check_reconciler_diff(checks, exchange)
+        await exchange.close()
+
+        account = PerpBitget(public_api="check", secret_api="check", password="check", api_url=mock.url)
+        await account.load_markets()
+        await check_reconciler_roundtrip(checks, account)
+        await account.close()
+
+    if markets_cache_path is not None:
+        exchange = PerpBitget(markets_cache_path=markets_cache_path, markets_cache_ttl=float("inf"))
+        await exchange.load_markets()
+        check_precision(checks, exchange, "cache")
+        await exchange.close()
+
+    await check_scheduler_lanes(checks)
+    print(f"{checks.count - len(checks.failures)}/{checks.count} checks passed")
+    return not checks.failures
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else None))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,28 @@
+import json
+import os
+import time
+
+
+# Lire le cache des marchés : renvoie (markets, currencies, âge en secondes) ou None si absent/illisible
+def read_markets_cache(path):
+    try:
+        with open(path, "r") as f:
+            content = json.load(f)
+        return content["markets"], content.get("currencies"), time.time() - content["timestamp"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# Écrire le cache des marchés de façon atomique (fichier temporaire puis remplacement)
+def write_markets_cache(path, markets, currencies=None):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(
+            {"timestamp": time.time(), "markets": markets, "currencies": currencies},
+            f,
+            default=str,
+        )
+    os.replace(tmp_path, path)
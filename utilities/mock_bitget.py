@@ -0,0 +1,911 @@
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from aiohttp import web, WSMsgType
+
+# Append the path to the Live-Tools-V2 directory for importing custom modules
+sys.path.append("./Live-Tools-V2")
+
+from utilities.bitget_perp import candle_boundaries
+
+# Granularités Bitget (contrats) envoyées par ccxt, et suffixes des canaux websocket candle{granularité},
+# avec le timeframe correspondant ; à partir de 6h ce sont les bougies UTC (*utc)
+GRANULARITY_TIMEFRAMES = {
+    "1m": "1m",
+    "3m": "3m",
+    "5m": "5m",
+    "15m": "15m",
+    "30m": "30m",
+    "1H": "1h",
+    "2H": "2h",
+    "4H": "4h",
+    "6Hutc": "6h",
+    "12Hutc": "12h",
+    "1Dutc": "1d",
+    "3Dutc": "3d",
+    "1Wutc": "1w",
+    "1Mutc": "1M",
+}
+
+# Contrats USDT par défaut : prix de référence, décimales du prix, pas du prix, décimales et minimum de la quantité
+DEFAULT_CONTRACTS = {
+    "BTC": {"price": 60000, "pricePlace": 1, "priceEndStep": 1, "volumePlace": 3, "minTradeNum": "0.001"},
+    "ETH": {"price": 3000, "pricePlace": 2, "priceEndStep": 1, "volumePlace": 2, "minTradeNum": "0.01"},
+    "SOL": {"price": 150, "pricePlace": 3, "priceEndStep": 1, "volumePlace": 1, "minTradeNum": "0.1"},
+    "ADA": {"price": 0.45, "pricePlace": 4, "priceEndStep": 1, "volumePlace": 0, "minTradeNum": "1"},
+    "DOGE": {"price": 0.15, "pricePlace": 5, "priceEndStep": 1, "volumePlace": 0, "minTradeNum": "1"},
+}
+
+PRODUCT_TYPE = "USDT-FUTURES"
+MIN_ORDER_USDT = 5
+
+
+class MockBitgetError(Exception):
+    def __init__(self, code, message, status=400):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status = status
+
+
+# État d'un compte du Bitget local : solde, ordres, positions, levier et mode de marge par symbole
+class MockAccount:
+    def __init__(self, balance):
+        self.balance = float(balance)
+        self.orders = {}
+        self.plan_orders = {}
+        self.positions = {}
+        self.leverage = {}
+        self.margin_mode = {}
+
+
+# Bitget local (API REST v2, contrats USDT) pour tester et mesurer PerpBitget sans clés ni réseau
+# Couvre marchés, bougies, solde, positions, ordres normaux et plan, annulations
+# Latence, limite de débit (par endpoint, en req/s) et injection d'erreurs sont configurables,
+# le tirage aléatoire est initialisé par seed pour des mesures reproductibles
+# Chaque clé API (en-tête ACCESS-KEY) a son propre compte, pour simuler plusieurs comptes sur un même serveur
+# Les ordres limit ne sont exécutés qu'à leur création s'ils croisent le prix courant, les ordres plan ne se déclenchent pas
+# Le websocket public (ws_url) sert les canaux de bougies : instantané à l'abonnement puis la bougie en cours
+# toutes les ws_interval secondes (avec la bougie qui vient de clôturer au changement de bougie)
+# Le websocket privé (ws_private_url) accepte tout login non vide et pousse, après chaque requête POST du compte,
+# les ordres modifiés et l'état complet des positions et du solde
+class MockBitget:
+    def __init__(
+        self,
+        contracts=None,
+        balance=10000,
+        latency=0.0,
+        jitter=0.0,
+        rate_limit=None,
+        error_rate=0.0,
+        seed=0,
+        host="127.0.0.1",
+        port=0,
+        ws_interval=0.5,
+        ws_snapshot_size=200,
+    ):
+        self.contracts = contracts if contracts is not None else DEFAULT_CONTRACTS
+        self.balance = balance
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.host = host
+        self.port = port
+        self.ws_interval = ws_interval
+        self.ws_snapshot_size = ws_snapshot_size
+        self.accounts = {}
+        self.requests = {}
+        self._random = random.Random(seed)
+        self._injected_errors = []
+        self._buckets = {}
+        self._next_id = 1000000
+        self._runner = None
+        self._ws_connections = set()
+        self._private_ws = []
+        self._routes = {
+            ("GET", "/api/v2/public/time"): self._time,
+            ("GET", "/api/v2/spot/public/symbols"): self._empty_list,
+            ("GET", "/api/v2/spot/public/coins"): self._empty_list,
+            ("GET", "/api/v2/mix/market/contracts"): self._contracts,
+            ("GET", "/api/v2/mix/market/candles"): self._candles,
+            ("GET", "/api/v2/mix/market/history-candles"): self._candles,
+            ("GET", "/api/v2/mix/market/tickers"): self._tickers,
+            ("GET", "/api/v2/mix/account/accounts"): self._accounts,
+            ("POST", "/api/v2/mix/account/set-margin-mode"): self._set_margin_mode,
+            ("POST", "/api/v2/mix/account/set-leverage"): self._set_leverage,
+            ("GET", "/api/v2/mix/position/all-position"): self._all_positions,
+            ("POST", "/api/v2/mix/order/place-order"): self._place_order,
+            ("POST", "/api/v2/mix/order/batch-place-order"): self._batch_place_order,
+            ("POST", "/api/v2/mix/order/place-plan-order"): self._place_plan_order,
+            ("POST", "/api/v2/mix/order/modify-plan-order"): self._modify_plan_order,
+            ("POST", "/api/v2/mix/order/place-tpsl-order"): self._place_tpsl_order,
+            ("POST", "/api/v2/mix/order/modify-tpsl-order"): self._modify_tpsl_order,
+            ("GET", "/api/v2/mix/order/orders-pending"): self._orders_pending,
+            ("GET", "/api/v2/mix/order/orders-plan-pending"): self._orders_plan_pending,
+            ("GET", "/api/v2/mix/order/detail"): self._order_detail,
+            ("POST", "/api/v2/mix/order/batch-cancel-orders"): self._batch_cancel_orders,
+            ("POST", "/api/v2/mix/order/cancel-plan-order"): self._cancel_plan_order,
+        }
+
+    # URL à passer à PerpBitget(api_url=...)
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # URL à passer à BitgetCandleStream(url=...)
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/v2/ws/public"
+
+    # URL à passer à BitgetAccountStream(url=...)
+    @property
+    def ws_private_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/v2/ws/private"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/v2/ws/public", self._ws_public)
+        app.router.add_get("/v2/ws/private", self._ws_private)
+        app.router.add_route("*", "/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        await self.drop_ws_connections()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    # Compte associé à une clé API, créé au premier appel
+    def account(self, api_key="") -> MockAccount:
+        if api_key not in self.accounts:
+            self.accounts[api_key] = MockAccount(self.balance)
+        return self.accounts[api_key]
+
+    # Faire échouer les count prochains appels d'un chemin (ou de tous si path=None)
+    # status=429 simule une limite de débit, status=500 une panne, delay un appel qui ne répond pas à temps
+    def inject_error(self, path=None, status=500, code="50000", message="Mock internal error", count=1, delay=0.0):
+        self._injected_errors.append(
+            {"path": path, "status": status, "code": code, "message": message, "count": count, "delay": delay}
+        )
+
+    # Ajouter une position ouverte (mode hedge)
+    def add_position(self, pair, side, size, entry_price, margin_mode="isolated", api_key=""):
+        symbol = self._symbol_id(pair)
+        self.account(api_key).positions[(symbol, side)] = {
+            "size": float(size),
+            "entry_price": float(entry_price),
+            "margin_mode": margin_mode,
+            "ctime": self._now(),
+        }
+
+    # Fermer toutes les connexions websocket, pour simuler une coupure réseau
+    async def drop_ws_connections(self):
+        await asyncio.gather(*[ws.close() for ws in list(self._ws_connections)])
+
+    # Prix du marché déterministe : somme de deux sinusoïdes autour du prix de référence
+    def price(self, symbol, ts=None) -> float:
+        ts = self._now() if ts is None else ts
+        contract = self.contracts[symbol[: -len("USDT")]]
+        phase = sum(ord(c) for c in symbol)
+        variation = 0.03 * math.sin(2 * math.pi * ts / (7 * 24 * 3600 * 1000) + phase) + 0.01 * math.sin(
+            2 * math.pi * ts / (9 * 3600 * 1000) + phase / 7
+        )
+        return contract["price"] * (1 + variation)
+
+    def _now(self) -> int:
+        return int(time.time() * 1000)
+
+    def _new_id(self) -> str:
+        self._next_id += 1
+        return str(self._next_id)
+
+    def _symbol_id(self, pair) -> str:
+        return pair.split(":")[0].replace("/", "")
+
+    def _contract(self, symbol) -> dict:
+        if not symbol or not symbol.endswith("USDT") or symbol[: -len("USDT")] not in self.contracts:
+            raise MockBitgetError("40034", f"Parameter {symbol} does not exist")
+        return self.contracts[symbol[: -len("USDT")]]
+
+    def _round_price(self, symbol, price) -> str:
+        return f"{price:.{self._contract(symbol)['pricePlace']}f}"
+
+    # Seau à jetons par endpoint
+    def _rate_limited(self, path) -> bool:
+        if self.rate_limit is None:
+            return False
+        rate = self.rate_limit.get(path, self.rate_limit.get("default")) if isinstance(self.rate_limit, dict) else self.rate_limit
+        if rate is None:
+            return False
+        now = time.monotonic()
+        tokens, last = self._buckets.get(path, (rate, now))
+        tokens = min(rate, tokens + (now - last) * rate)
+        if tokens < 1:
+            self._buckets[path] = (tokens, now)
+            return True
+        self._buckets[path] = (tokens - 1, now)
+        return False
+
+    def _take_injected_error(self, path):
+        for error in self._injected_errors:
+            if error["path"] is None or error["path"] == path:
+                error["count"] -= 1
+                if error["count"] <= 0:
+                    self._injected_errors.remove(error)
+                return error
+        return None
+
+    async def _handle(self, request):
+        path = "/" + request.match_info["path"]
+        self.requests[path] = self.requests.get(path, 0) + 1
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+        error = self._take_injected_error(path)
+        if error is None and self.error_rate and self._random.random() < self.error_rate:
+            error = {"status": 500, "code": "50000", "message": "Mock random error", "delay": 0.0}
+        if error is None and self._rate_limited(path):
+            error = {"status": 429, "code": "429", "message": "Too Many Requests", "delay": 0.0}
+        if error is not None:
+            if error["delay"]:
+                await asyncio.sleep(error["delay"])
+            return self._response(None, error["code"], error["message"], error["status"])
+        handler = self._routes.get((request.method, path))
+        if handler is None:
+            return self._response(None, "40404", f"Request URL NOT FOUND {path}", 404)
+        if request.method == "POST":
+            params = await request.json() if request.can_read_body else {}
+        else:
+            params = dict(request.query)
+        api_key = request.headers.get("ACCESS-KEY", "")
+        try:
+            data = handler(self.account(api_key), params)
+        except MockBitgetError as e:
+            return self._response(None, e.code, e.message, e.status)
+        if request.method == "POST":
+            await self._ws_publish(api_key)
+        return self._response(data)
+
+    def _response(self, data, code="00000", message="success", status=200):
+        return web.json_response(
+            {"code": code, "msg": message, "requestTime": self._now(), "data": data}, status=status
+        )
+
+    def _time(self, account, params):
+        return {"serverTime": str(self._now())}
+
+    def _empty_list(self, account, params):
+        return []
+
+    def _contracts(self, account, params):
+        if params.get("productType", PRODUCT_TYPE).upper() != PRODUCT_TYPE:
+            return []
+        return [
+            {
+                "symbol": f"{base}USDT",
+                "baseCoin": base,
+                "quoteCoin": "USDT",
+                "makerFeeRate": "0.0002",
+                "takerFeeRate": "0.0006",
+                "supportMarginCoins": ["USDT"],
+                "minTradeNum": contract["minTradeNum"],
+                "priceEndStep": str(contract["priceEndStep"]),
+                "volumePlace": str(contract["volumePlace"]),
+                "pricePlace": str(contract["pricePlace"]),
+                "sizeMultiplier": contract["minTradeNum"],
+                "symbolType": "perpetual",
+                "minTradeUSDT": str(MIN_ORDER_USDT),
+                "symbolStatus": "normal",
+                "minLever": "1",
+                "maxLever": "125",
+            }
+            for base, contract in self.contracts.items()
+        ]
+
+    # Tickers de tous les contrats : dernier prix et prix de marque au prix courant, un pas de prix d'écart acheteur / vendeur
+    def _tickers(self, account, params):
+        if params.get("productType", PRODUCT_TYPE).upper() != PRODUCT_TYPE:
+            return []
+        now = self._now()
+        tickers = []
+        for base, contract in self.contracts.items():
+            symbol = f"{base}USDT"
+            price = self.price(symbol, now)
+            tick = 10 ** -int(contract["pricePlace"])
+            last = self._round_price(symbol, price)
+            tickers.append(
+                {
+                    "symbol": symbol,
+                    "lastPr": last,
+                    "bidPr": self._round_price(symbol, float(last) - tick),
+                    "askPr": self._round_price(symbol, float(last) + tick),
+                    "bidSz": "1",
+                    "askSz": "1",
+                    "high24h": self._round_price(symbol, price * 1.01),
+                    "low24h": self._round_price(symbol, price * 0.99),
+                    "ts": str(now),
+                    "change24h": "0",
+                    "baseVolume": "0",
+                    "quoteVolume": "0",
+                    "usdtVolume": "0",
+                    "indexPrice": last,
+                    "markPrice": last,
+                    "fundingRate": "0.0001",
+                    "holdingAmount": "0",
+                }
+            )
+        return tickers
+
+    # Bougies entre startTime et endTime (bornes incluses), bougie en cours comprise, au plus limit (les plus récentes)
+    # Les bornes des bougies sont celles de candle_boundaries (semaines le lundi, mois calendaires)
+    def _candles(self, account, params):
+        symbol = params.get("symbol")
+        self._contract(symbol)
+        timeframe = GRANULARITY_TIMEFRAMES.get(params.get("granularity"))
+        if timeframe is None:
+            raise MockBitgetError("40020", "Parameter granularity error")
+        limit = min(int(params.get("limit", 100)), 1000)
+        now = self._now()
+        end_ts = min(int(params.get("endTime", now)), now)
+        return self._candle_window(symbol, timeframe, int(params.get("startTime", 0)), end_ts, limit, now, self._candle)
+
+    # Les limit dernières bougies ouvertes entre start_ts et end_ts, dans l'ordre chronologique
+    def _candle_window(self, symbol, timeframe, start_ts, end_ts, limit, now, candle) -> list:
+        candles = []
+        boundaries = candle_boundaries(timeframe, end_ts)
+        while len(candles) < limit and boundaries.open_ts >= start_ts:
+            candles.append(candle(symbol, boundaries.open_ts, boundaries.close_ts, now))
+            boundaries = candle_boundaries(timeframe, boundaries.open_ts - 1)
+        return candles[::-1]
+
+    # Bougies ouvertes de first_open à last_open inclus
+    def _candles_between(self, symbol, timeframe, first_open, last_open, now, candle) -> list:
+        candles = []
+        boundaries = candle_boundaries(timeframe, first_open)
+        while boundaries.open_ts <= last_open:
+            candles.append(candle(symbol, boundaries.open_ts, boundaries.close_ts, now))
+            boundaries = candle_boundaries(timeframe, boundaries.close_ts)
+        return candles
+
+    # Bougie ouverte à ts et close à close_ts, arrêtée à now si elle est en cours :
+    # [ts, open, high, low, close, volume base, volume quote]
+    def _candle(self, symbol, ts, close_ts, now) -> list:
+        open_price = self.price(symbol, ts)
+        close_price = self.price(symbol, min(close_ts, now))
+        volume = 1000 + (ts // (close_ts - ts)) % 97
+        return [
+            str(ts),
+            self._round_price(symbol, open_price),
+            self._round_price(symbol, max(open_price, close_price) * 1.002),
+            self._round_price(symbol, min(open_price, close_price) * 0.998),
+            self._round_price(symbol, close_price),
+            str(volume),
+            str(round(volume * close_price, 2)),
+        ]
+
+    # Bougie au format websocket : volume en USDT en plus
+    def _ws_candle(self, symbol, ts, close_ts, now) -> list:
+        candle = self._candle(symbol, ts, close_ts, now)
+        return candle + [candle[-1]]
+
+    # Websocket public : ping/pong, abonnement et désabonnement aux canaux candle{granularité}
+    async def _ws_public(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.requests["/v2/ws/public"] = self.requests.get("/v2/ws/public", 0) + 1
+        self._ws_connections.add(ws)
+        subscriptions = {}
+        push_task = asyncio.create_task(self._ws_push(ws, subscriptions))
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                if message.data == "ping":
+                    await ws.send_str("pong")
+                    continue
+                try:
+                    op = json.loads(message.data)
+                except ValueError:
+                    await ws.send_json({"event": "error", "code": 30012, "msg": "Invalid request"})
+                    continue
+                for arg in op.get("args", []):
+                    channel = arg.get("channel", "")
+                    symbol = arg.get("instId", "")
+                    timeframe = GRANULARITY_TIMEFRAMES.get(channel[len("candle") :]) if channel.startswith("candle") else None
+                    if timeframe is None or not symbol.endswith("USDT") or symbol[: -len("USDT")] not in self.contracts:
+                        await ws.send_json(
+                            {"event": "error", "arg": arg, "code": 30001, "msg": f"{channel} {symbol} doesn't exist"}
+                        )
+                    elif op.get("op") == "subscribe":
+                        await ws.send_json({"event": "subscribe", "arg": arg})
+                        now = self._now()
+                        current = candle_boundaries(timeframe, now).open_ts
+                        snapshot = self._candle_window(symbol, timeframe, 0, now, self.ws_snapshot_size, now, self._ws_candle)
+                        await ws.send_json({"action": "snapshot", "arg": arg, "data": snapshot, "ts": now})
+                        subscriptions[(channel, symbol)] = (arg, timeframe, current)
+                    elif op.get("op") == "unsubscribe":
+                        subscriptions.pop((channel, symbol), None)
+                        await ws.send_json({"event": "unsubscribe", "arg": arg})
+        finally:
+            push_task.cancel()
+            self._ws_connections.discard(ws)
+        return ws
+
+    # Websocket privé : login (toute clé non vide, le compte est celui de la clé), canaux account, positions,
+    # orders et orders-algo ; aucun instantané d'ordres à l'abonnement, comme sur Bitget
+    async def _ws_private(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.requests["/v2/ws/private"] = self.requests.get("/v2/ws/private", 0) + 1
+        connection = {"ws": ws, "api_key": None, "channels": {}, "versions": {}}
+        self._ws_connections.add(ws)
+        self._private_ws.append(connection)
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                if message.data == "ping":
+                    await ws.send_str("pong")
+                    continue
+                try:
+                    op = json.loads(message.data)
+                except ValueError:
+                    await ws.send_json({"event": "error", "code": 30012, "msg": "Invalid request"})
+                    continue
+                if op.get("op") == "login":
+                    args = (op.get("args") or [{}])[0]
+                    if not args.get("apiKey") or not args.get("sign") or not args.get("timestamp"):
+                        await ws.send_json({"event": "error", "code": 30005, "msg": "Login failed"})
+                        continue
+                    connection["api_key"] = args["apiKey"]
+                    await ws.send_json({"event": "login", "code": 0, "msg": ""})
+                    continue
+                for arg in op.get("args", []):
+                    channel = arg.get("channel")
+                    if connection["api_key"] is None:
+                        await ws.send_json({"event": "error", "arg": arg, "code": 30004, "msg": "User not logged in"})
+                    elif channel not in ["account", "positions", "orders", "orders-algo"]:
+                        await ws.send_json({"event": "error", "arg": arg, "code": 30001, "msg": f"{channel} doesn't exist"})
+                    elif op.get("op") == "subscribe":
+                        connection["channels"][channel] = arg
+                        await ws.send_json({"event": "subscribe", "arg": arg})
+                        account = self.account(connection["api_key"])
+                        if channel in ["orders", "orders-algo"]:
+                            orders = account.orders if channel == "orders" else account.plan_orders
+                            connection["versions"].update({order_id: order["uTime"] for order_id, order in orders.items()})
+                        else:
+                            await self._ws_push_channel(connection, channel, arg, "snapshot")
+                    elif op.get("op") == "unsubscribe":
+                        connection["channels"].pop(channel, None)
+                        await ws.send_json({"event": "unsubscribe", "arg": arg})
+        finally:
+            self._private_ws.remove(connection)
+            self._ws_connections.discard(ws)
+        return ws
+
+    async def _ws_publish(self, api_key):
+        for connection in list(self._private_ws):
+            if connection["api_key"] == api_key:
+                for channel, arg in list(connection["channels"].items()):
+                    await self._ws_push_channel(connection, channel, arg, "update")
+
+    # Les positions sont toujours envoyées en entier, les ordres seulement s'ils ont changé depuis le dernier envoi
+    async def _ws_push_channel(self, connection, channel, arg, action):
+        account = self.account(connection["api_key"])
+        if channel == "account":
+            entry = self._account_entry(account)
+            data = [
+                {
+                    "marginCoin": "USDT",
+                    "frozen": entry["locked"],
+                    "available": entry["available"],
+                    "maxOpenPosAvailable": entry["available"],
+                    "maxTransferOut": entry["maxTransferOut"],
+                    "equity": entry["accountEquity"],
+                    "usdtEquity": entry["usdtEquity"],
+                    "unrealizedPL": entry["unrealizedPL"],
+                }
+            ]
+        elif channel == "positions":
+            action = "snapshot"
+            data = []
+            for position in self._all_positions(account, {}):
+                position["instId"] = position.pop("symbol")
+                position.pop("markPrice")
+                position["uTime"] = str(self._now())
+                data.append(position)
+        else:
+            orders = account.orders if channel == "orders" else account.plan_orders
+            data = []
+            for order_id, order in orders.items():
+                if connection["versions"].get(order_id) == order["uTime"]:
+                    continue
+                connection["versions"][order_id] = order["uTime"]
+                data.append(self._ws_order(order))
+            if not data:
+                return
+        if not connection["ws"].closed:
+            await connection["ws"].send_json({"action": action, "arg": arg, "data": data, "ts": self._now()})
+
+    # Ordre au format websocket : instId, et pour un ordre normal ordType et accBaseVolume
+    def _ws_order(self, order) -> dict:
+        data = dict(order)
+        data["instId"] = data.pop("symbol")
+        if "planType" in data:
+            data["price"] = data["executePrice"]
+            data["status"] = data["planStatus"]
+        else:
+            data["ordType"] = data.pop("orderType")
+            data["accBaseVolume"] = data.pop("baseVolume")
+        return data
+
+    async def _ws_push(self, ws, subscriptions):
+        while True:
+            await asyncio.sleep(self.ws_interval)
+            now = self._now()
+            for key, (arg, timeframe, last) in list(subscriptions.items()):
+                current = candle_boundaries(timeframe, now).open_ts
+                data = self._candles_between(arg["instId"], timeframe, last, current, now, self._ws_candle)
+                subscriptions[key] = (arg, timeframe, current)
+                await ws.send_json({"action": "update", "arg": arg, "data": data, "ts": now})
+
+    def _unrealized_pnl(self, symbol, side, position) -> float:
+        direction = 1 if side == "long" else -1
+        return direction * (self.price(symbol) - position["entry_price"]) * position["size"]
+
+    def _position_margin(self, account, symbol, side, position) -> float:
+        leverage = account.leverage.get((symbol, side), account.leverage.get((symbol, None), 1))
+        return position["entry_price"] * position["size"] / leverage
+
+    def _accounts(self, account, params):
+        return [self._account_entry(account)]
+
+    def _account_entry(self, account) -> dict:
+        unrealized = sum(self._unrealized_pnl(symbol, side, pos) for (symbol, side), pos in account.positions.items())
+        locked = sum(self._position_margin(account, symbol, side, pos) for (symbol, side), pos in account.positions.items())
+        equity = account.balance + unrealized
+        available = equity - locked
+        return {
+            "marginCoin": "USDT",
+            "locked": str(round(locked, 4)),
+            "available": str(round(available, 4)),
+            "crossedMaxAvailable": str(round(available, 4)),
+            "isolatedMaxAvailable": str(round(available, 4)),
+            "maxTransferOut": str(round(available, 4)),
+            "accountEquity": str(round(equity, 4)),
+            "usdtEquity": str(round(equity, 4)),
+            "unrealizedPL": str(round(unrealized, 4)),
+        }
+
+    def _set_margin_mode(self, account, params):
+        symbol = params.get("symbol")
+        self._contract(symbol)
+        account.margin_mode[symbol] = params.get("marginMode", "crossed")
+        return {"symbol": symbol, "marginCoin": "USDT", "marginMode": account.margin_mode[symbol]}
+
+    def _set_leverage(self, account, params):
+        symbol = params.get("symbol")
+        self._contract(symbol)
+        account.leverage[(symbol, params.get("holdSide"))] = float(params.get("leverage", 1))
+        return {"symbol": symbol, "marginCoin": "USDT", "longLeverage": params.get("leverage"), "shortLeverage": params.get("leverage")}
+
+    def _all_positions(self, account, params):
+        positions = []
+        for (symbol, side), position in account.positions.items():
+            mark_price = self.price(symbol)
+            leverage = account.leverage.get((symbol, side), account.leverage.get((symbol, None), 1))
+            positions.append(
+                {
+                    "marginCoin": "USDT",
+                    "symbol": symbol,
+                    "holdSide": side,
+                    "openDelegateSize": "0",
+                    "marginSize": str(round(self._position_margin(account, symbol, side, position), 4)),
+                    "available": str(position["size"]),
+                    "locked": "0",
+                    "total": str(position["size"]),
+                    "leverage": str(leverage),
+                    "achievedProfits": "0",
+                    "openPriceAvg": str(position["entry_price"]),
+                    "marginMode": position["margin_mode"],
+                    "posMode": "hedge_mode",
+                    "unrealizedPL": str(round(self._unrealized_pnl(symbol, side, position), 4)),
+                    "liquidationPrice": "0",
+                    "keepMarginRate": "0.004",
+                    "markPrice": self._round_price(symbol, mark_price),
+                    "marginRatio": "0",
+                    "cTime": str(position["ctime"]),
+                }
+            )
+        return positions
+
+    # Vérifier et normaliser un ordre reçu (mode hedge : side + tradeSide, une fermeture garde le side de la position)
+    def _order_request(self, params, symbol=None, margin_mode=None) -> dict:
+        symbol = symbol or params.get("symbol")
+        contract = self._contract(symbol)
+        order_type = params.get("orderType", "limit")
+        side = params.get("side")
+        trade_side = (params.get("tradeSide") or "open").lower()
+        if side not in ["buy", "sell"]:
+            raise MockBitgetError("40020", "Parameter side error")
+        size = float(params.get("size", 0))
+        price = params.get("price") or params.get("executePrice")
+        reference_price = float(params.get("triggerPrice") or price or self.price(symbol))
+        if size < float(contract["minTradeNum"]) or (
+            trade_side == "open" and size * reference_price < MIN_ORDER_USDT
+        ):
+            raise MockBitgetError("45110", f"less than the minimum amount {MIN_ORDER_USDT} USDT")
+        if order_type == "limit" and not price:
+            raise MockBitgetError("43011", "The parameter does not meet the specification executePrice <= 0")
+        now = str(self._now())
+        return {
+            "orderId": self._new_id(),
+            "clientOid": params.get("clientOid") or self._new_id(),
+            "symbol": symbol,
+            "size": f"{size:.{contract['volumePlace']}f}",
+            "price": str(price) if price else "0",
+            "priceAvg": "",
+            "baseVolume": "0",
+            "side": side,
+            "posSide": ("long" if side == "buy" else "short"),
+            "tradeSide": trade_side,
+            "orderType": order_type,
+            "force": params.get("force", "gtc"),
+            "marginMode": params.get("marginMode") or margin_mode or "crossed",
+            "reduceOnly": "YES" if trade_side == "close" else "NO",
+            "status": "live",
+            "cTime": now,
+            "uTime": now,
+        }
+
+    # Exécuter un ordre sur la position correspondante
+    def _fill(self, account, order, price):
+        symbol = order["symbol"]
+        side = order["posSide"]
+        size = float(order["size"])
+        position = account.positions.get((symbol, side))
+        if order["tradeSide"] == "open":
+            if position is None:
+                account.positions[(symbol, side)] = {
+                    "size": size,
+                    "entry_price": price,
+                    "margin_mode": order["marginMode"],
+                    "ctime": self._now(),
+                }
+            else:
+                total = position["size"] + size
+                position["entry_price"] = (position["entry_price"] * position["size"] + price * size) / total
+                position["size"] = total
+        else:
+            if position is None:
+                raise MockBitgetError("22002", "No position to close")
+            size = min(size, position["size"])
+            direction = 1 if side == "long" else -1
+            account.balance += direction * (price - position["entry_price"]) * size
+            position["size"] -= size
+            if position["size"] <= 0:
+                del account.positions[(symbol, side)]
+                self._cancel_position_tpsl(account, symbol, side)
+        order["status"] = "filled"
+        order["baseVolume"] = order["size"]
+        order["priceAvg"] = str(price)
+        order["uTime"] = str(self._now())
+
+    # Un ordre market, ou limit qui croise le prix courant, est exécuté immédiatement
+    def _submit_order(self, account, order):
+        mark_price = float(self._round_price(order["symbol"], self.price(order["symbol"])))
+        price = float(order["price"] or 0)
+        buy = order["side"] == "buy" if order["tradeSide"] == "open" else order["side"] == "sell"
+        if order["orderType"] == "market":
+            self._fill(account, order, mark_price)
+        elif (buy and price >= mark_price) or (not buy and price <= mark_price):
+            self._fill(account, order, mark_price)
+        account.orders[order["orderId"]] = order
+
+    def _place_order(self, account, params):
+        order = self._order_request(params)
+        self._submit_order(account, order)
+        return {"orderId": order["orderId"], "clientOid": order["clientOid"]}
+
+    def _batch_place_order(self, account, params):
+        order_list = params.get("orderList") or []
+        if len(order_list) > 50:
+            raise MockBitgetError("40020", "orderList size exceeds 50")
+        success, failure = [], []
+        for item in order_list:
+            try:
+                order = self._order_request(item, params.get("symbol"), params.get("marginMode"))
+                self._submit_order(account, order)
+                success.append({"orderId": order["orderId"], "clientOid": order["clientOid"]})
+            except MockBitgetError as e:
+                failure.append(
+                    {"orderId": "", "clientOid": item.get("clientOid", ""), "errorMsg": e.message, "errorCode": e.code}
+                )
+        return {"successList": success, "failureList": failure}
+
+    def _place_plan_order(self, account, params):
+        if not params.get("triggerPrice"):
+            raise MockBitgetError("40020", "Parameter triggerPrice error")
+        order = self._order_request(params)
+        order.pop("price")
+        order.update(
+            {
+                "executePrice": params.get("executePrice") or "0",
+                "triggerPrice": params["triggerPrice"],
+                "triggerType": params.get("triggerType", "mark_price"),
+                "planType": params.get("planType", "normal_plan"),
+                "planStatus": "live",
+                "status": "live",
+            }
+        )
+        account.plan_orders[order["orderId"]] = order
+        return {"orderId": order["orderId"], "clientOid": order["clientOid"]}
+
+    def _modify_plan_order(self, account, params):
+        order = account.plan_orders.get(params.get("orderId"))
+        if order is None or order["planStatus"] != "live":
+            raise MockBitgetError("40768", "Order does not exist")
+        if params.get("newTriggerPrice"):
+            order["triggerPrice"] = params["newTriggerPrice"]
+        if params.get("newPrice"):
+            order["executePrice"] = params["newPrice"]
+        if params.get("newSize"):
+            order["size"] = params["newSize"]
+        order["uTime"] = str(self._now())
+        return {"orderId": order["orderId"], "clientOid": order["clientOid"]}
+
+    # TP/SL de position (pos_loss, pos_profit) : un seul de chaque par position, annulé à la fermeture de la position
+    def _place_tpsl_order(self, account, params):
+        symbol = params.get("symbol")
+        self._contract(symbol)
+        plan_type = params.get("planType")
+        side = params.get("holdSide")
+        if plan_type not in ["pos_loss", "pos_profit"]:
+            raise MockBitgetError("40020", "Parameter planType error")
+        if not params.get("triggerPrice"):
+            raise MockBitgetError("40020", "Parameter triggerPrice error")
+        position = account.positions.get((symbol, side))
+        if position is None:
+            raise MockBitgetError("22002", "No position to set TP/SL")
+        for order in account.plan_orders.values():
+            if (order["symbol"], order["posSide"], order["planType"], order["planStatus"]) == (symbol, side, plan_type, "live"):
+                raise MockBitgetError("40020", "Position TP/SL already exists")
+        now = str(self._now())
+        order = {
+            "orderId": self._new_id(),
+            "clientOid": params.get("clientOid") or self._new_id(),
+            "symbol": symbol,
+            "size": "",
+            "executePrice": params.get("executePrice") or "0",
+            "triggerPrice": params["triggerPrice"],
+            "triggerType": params.get("triggerType", "mark_price"),
+            "planType": plan_type,
+            "planStatus": "live",
+            "status": "live",
+            "side": "sell" if side == "long" else "buy",
+            "posSide": side,
+            "tradeSide": "close",
+            "orderType": "market",
+            "marginMode": position["margin_mode"],
+            "reduceOnly": "YES",
+            "cTime": now,
+            "uTime": now,
+        }
+        account.plan_orders[order["orderId"]] = order
+        return {"orderId": order["orderId"], "clientOid": order["clientOid"]}
+
+    def _modify_tpsl_order(self, account, params):
+        order = account.plan_orders.get(params.get("orderId"))
+        if order is None or order["planStatus"] != "live" or order["planType"] not in ["pos_loss", "pos_profit"]:
+            raise MockBitgetError("40768", "Order does not exist")
+        if not params.get("triggerPrice"):
+            raise MockBitgetError("40020", "Parameter triggerPrice error")
+        order["triggerPrice"] = params["triggerPrice"]
+        order["triggerType"] = params.get("triggerType", order["triggerType"])
+        order["uTime"] = str(self._now())
+        return {"orderId": order["orderId"], "clientOid": order["clientOid"]}
+
+    def _cancel_position_tpsl(self, account, symbol, side):
+        for order in account.plan_orders.values():
+            if (
+                order["symbol"] == symbol
+                and order["posSide"] == side
+                and order["planType"] in ["pos_loss", "pos_profit"]
+                and order["planStatus"] == "live"
+            ):
+                order["planStatus"] = "cancelled"
+                order["status"] = "cancelled"
+                order["uTime"] = str(self._now())
+
+    # Pagination Bitget : ordres du plus récent au plus ancien, curseur idLessThan, endId = dernier id de la page
+    def _paginate(self, orders, params):
+        symbol = params.get("symbol")
+        limit = min(int(params.get("limit", 100)), 100)
+        orders = sorted(
+            (order for order in orders if symbol is None or order["symbol"] == symbol),
+            key=lambda order: int(order["orderId"]),
+            reverse=True,
+        )
+        if params.get("idLessThan"):
+            orders = [order for order in orders if int(order["orderId"]) < int(params["idLessThan"])]
+        page = orders[:limit]
+        return {
+            "entrustedList": page or None,
+            "endId": page[-1]["orderId"] if page else None,
+        }
+
+    def _orders_pending(self, account, params):
+        return self._paginate([order for order in account.orders.values() if order["status"] == "live"], params)
+
+    # planType=profit_loss liste les TP/SL, dont ceux de position
+    def _orders_plan_pending(self, account, params):
+        plan_type = params.get("planType", "normal_plan")
+        plan_types = ["pos_loss", "pos_profit", "loss_plan", "profit_plan"] if plan_type == "profit_loss" else [plan_type]
+        return self._paginate(
+            [
+                order
+                for order in account.plan_orders.values()
+                if order["planStatus"] == "live" and order["planType"] in plan_types
+            ],
+            params,
+        )
+
+    def _order_detail(self, account, params):
+        order = account.orders.get(params.get("orderId"))
+        if order is None or order["symbol"] != params.get("symbol"):
+            raise MockBitgetError("40109", "The data of the order cannot be found")
+        return order
+
+    # Annuler une liste d'ordres, ou tous ceux du symbole (ou du produit si aucun symbole n'est donné)
+    def _cancel(self, orders, params, status_key, canceled_status):
+        symbol = params.get("symbol")
+        ids = [item["orderId"] for item in params.get("orderIdList") or []]
+        if not ids:
+            ids = [
+                order_id
+                for order_id, order in orders.items()
+                if order[status_key] == "live" and (symbol is None or order["symbol"] == symbol)
+            ]
+        success, failure = [], []
+        for order_id in ids:
+            order = orders.get(order_id)
+            if order is None or order[status_key] != "live" or (symbol is not None and order["symbol"] != symbol):
+                failure.append({"orderId": order_id, "clientOid": "", "errorMsg": "Order does not exist", "errorCode": "40768"})
+                continue
+            order[status_key] = canceled_status
+            order["uTime"] = str(self._now())
+            success.append({"orderId": order_id, "clientOid": order["clientOid"]})
+        return {"successList": success, "failureList": failure}
+
+    def _batch_cancel_orders(self, account, params):
+        return self._cancel(account.orders, params, "status", "canceled")
+
+    def _cancel_plan_order(self, account, params):
+        return self._cancel(account.plan_orders, params, "planStatus", "cancelled")
+
+
+# Lancer le Bitget local seul, depuis le dossier parent comme les stratégies : python Live-Tools-V2/utilities/mock_bitget.py [port]
+if __name__ == "__main__":
+
+    async def serve():
+        port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+        async with MockBitget(port=port) as mock:
+            print(f"Mock Bitget listening on {mock.url}")
+            await asyncio.Event().wait()
+
+    asyncio.run(serve())
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import os
+import time
+import pandas as pd
+from utilities.bitget_perp import TIMEFRAME_MS, ohlcv_chunk_ms, candle_boundaries, candles_close_ts
+from utilities.ohlcv_store import OhlcvStore
+
+
+# Convertir une date (timestamp ms, datetime ou chaîne lisible par pandas, UTC si naïve) en timestamp ms
+def to_timestamp_ms(date) -> int:
+    if isinstance(date, (int, float)):
+        return int(date)
+    timestamp = pd.Timestamp(date)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return int(timestamp.timestamp() * 1000)
+
+
+# Téléchargeur d'historique multi-paires/timeframes sur une plage de dates quelconque
+# Les bougies clôturées sont ajoutées dans un OhlcvStore (un fichier par paire/timeframe, en ajout seul)
+# et un point de contrôle par paire/timeframe permet de reprendre après une interruption
+class OhlcvDownloader:
+    def __init__(self, exchange, path, max_concurrency=4, chunks_per_step=10):
+        self.exchange = exchange
+        self.store = OhlcvStore(path)
+        self.max_concurrency = max_concurrency
+        self.chunks_per_step = chunks_per_step
+        self._checkpoint_path = os.path.join(path, "checkpoints.json")
+        self._checkpoints = self._read_checkpoints()
+
+    def _read_checkpoints(self) -> dict:
+        try:
+            with open(self._checkpoint_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_checkpoints(self):
+        tmp_path = f"{self._checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._checkpoints, f)
+        os.replace(tmp_path, self._checkpoint_path)
+
+    # Télécharger toutes les paires/timeframes, au plus max_concurrency en parallèle
+    # Renvoie par (paire, timeframe) le nombre de bougies ajoutées, ou l'exception rencontrée
+    async def download(self, pairs, timeframes, start, end=None) -> dict:
+        start_ts = to_timestamp_ms(start)
+        end_ts = to_timestamp_ms(end) if end is not None else int(time.time() * 1000)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        jobs = [(pair, timeframe) for pair in pairs for timeframe in timeframes]
+
+        async def run(pair, timeframe):
+            async with semaphore:
+                return await self.download_pair(pair, timeframe, start_ts, end_ts)
+
+        results = await asyncio.gather(
+            *[run(pair, timeframe) for pair, timeframe in jobs], return_exceptions=True
+        )
+        return dict(zip(jobs, results))
+
+    # Début de la plage déjà téléchargée pour une paire/timeframe (None si rien n'a été téléchargé)
+    # À défaut de point de contrôle (stockage antérieur), c'est la première bougie stockée
+    def _covered_start(self, key, pair, timeframe):
+        start_ts = self._checkpoints.get(f"{key}|start")
+        if start_ts is None:
+            start_ts = self.store.first_timestamp(pair, timeframe)
+        return start_ts
+
+    # Date de cotation de la paire (ms) si Bitget la fournit (launchTime), None sinon
+    def _listing_ts(self, pair):
+        market = self.exchange.get_pair_info(pair) or {}
+        return market.get("created") or None
+
+    # Début de la première fenêtre de requête (ohlcv_chunk_ms) vide alors que la paire était déjà cotée, ou None
+    # La paire est cotée à partir de listed_ts (None si inconnu) et au plus tard à sa première bougie reçue
+    # Une fenêtre où aucune bougie clôturée n'est attendue (pas d'ouverture, bougie en cours) n'est pas vérifiée
+    def _first_empty_window(self, timeframe, start_ts, end_ts, candles, now, listed_ts):
+        chunk_ms = ohlcv_chunk_ms(timeframe, history=True)
+        for window_start in range(start_ts, end_ts + 1, chunk_ms):
+            window_end = min(window_start + chunk_ms - 1, end_ts)
+            boundaries = candle_boundaries(timeframe, window_start)
+            if boundaries.open_ts < window_start:
+                boundaries = candle_boundaries(timeframe, boundaries.close_ts)
+            if boundaries.open_ts > window_end or boundaries.close_ts > now:
+                continue
+            in_window = candles[(candles[:, 0] >= window_start) & (candles[:, 0] <= window_end)]
+            if len(in_window) > 0:
+                listed_ts = min(listed_ts, int(in_window[0, 0])) if listed_ts is not None else int(in_window[0, 0])
+            elif listed_ts is not None and listed_ts <= boundaries.open_ts:
+                return window_start
+        return None
+
+    # Télécharger une paire/timeframe de start_ts à end_ts (ms), en reprenant là où le dernier passage s'est arrêté
+    # Le stockage étant en ajout seul, une plage ne peut être prolongée que vers l'avant et sans trou :
+    # un start_ts antérieur à la plage déjà téléchargée, ou postérieur à sa fin, lève une ValueError
+    # (télécharger cette autre plage dans un autre dossier)
+    # Une fenêtre sans bougie après la cotation arrête le téléchargement avant elle, sans avancer le point de contrôle,
+    # pour ne pas laisser de trou définitif dans le stockage : le passage suivant la redemandera
+    async def download_pair(self, pair, timeframe, start_ts, end_ts) -> int:
+        tf_ms = TIMEFRAME_MS[timeframe]
+        key = f"{pair}|{timeframe}"
+        # Reprise après le dernier point de contrôle et la bougie qui suit la dernière stockée (mois calendaires pour 1M)
+        last_ts = self.store.last_timestamp(pair, timeframe)
+        resume_ts = [self._checkpoints[key]] if key in self._checkpoints else []
+        if last_ts is not None:
+            resume_ts.append(candle_boundaries(timeframe, last_ts).close_ts)
+        if not resume_ts:
+            self._checkpoints[f"{key}|start"] = start_ts
+            self._write_checkpoints()
+            current_ts = start_ts
+        else:
+            current_ts = max(resume_ts)
+            covered_start_ts = self._covered_start(key, pair, timeframe)
+            if covered_start_ts is not None and start_ts < covered_start_ts:
+                raise ValueError(
+                    f"{pair} {timeframe}: start {start_ts} is before the downloaded history ({covered_start_ts}), "
+                    f"the store is append-only, download the missing range into another path"
+                )
+            if start_ts > current_ts:
+                raise ValueError(
+                    f"{pair} {timeframe}: start {start_ts} is after the end of the downloaded history ({current_ts}), "
+                    f"the store is append-only, download the range into another path to avoid a gap"
+                )
+        listed_ts = self._listing_ts(pair) if last_ts is None else last_ts
+        step_ms = ohlcv_chunk_ms(timeframe, history=True) * self.chunks_per_step
+        added = 0
+        while current_ts < end_ts:
+            step_end_ts = min(current_ts + step_ms - 1, end_ts)
+            candles = await self.exchange.get_ohlcv_range(
+                pair, timeframe, current_ts, step_end_ts, history=True
+            )
+            now = int(time.time() * 1000)
+            closed = (candles[:, 0] >= current_ts) & (candles_close_ts(timeframe, candles[:, 0]) <= now)
+            candles = candles[closed]
+            empty_ts = self._first_empty_window(timeframe, current_ts, step_end_ts, candles, now, listed_ts)
+            if empty_ts is not None:
+                added += self.store.append(pair, timeframe, candles[candles[:, 0] < empty_ts])
+                if empty_ts > current_ts:
+                    self._checkpoints[key] = empty_ts
+                    self._write_checkpoints()
+                raise Exception(
+                    f"No {pair} {timeframe} candle returned from {empty_ts} although the pair was listed, "
+                    f"download stopped before this window"
+                )
+            added += self.store.append(pair, timeframe, candles)
+            if len(candles) > 0 and listed_ts is None:
+                listed_ts = int(candles[0, 0])
+            # Ne pas marquer comme parcourue une fenêtre qui contient encore la bougie en cours
+            if step_end_ts + tf_ms > now:
+                break
+            current_ts = step_end_ts + 1
+            self._checkpoints[key] = current_ts
+            self._write_checkpoints()
+        return added
@@ -0,0 +1,85 @@
+import os
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+ROW_BYTES = len(OHLCV_COLUMNS) * np.dtype(np.float64).itemsize
+
+
+# Trier les bougies par timestamp et supprimer les doublons (première occurrence gardée), sans copie si déjà propre
+def sort_unique_candles(candles) -> np.ndarray:
+    timestamps = candles[:, 0]
+    if len(candles) < 2 or np.all(timestamps[1:] > timestamps[:-1]):
+        return candles
+    order = np.argsort(timestamps, kind="stable")
+    sorted_timestamps = timestamps[order]
+    keep = np.concatenate(([True], sorted_timestamps[1:] != sorted_timestamps[:-1]))
+    return candles[order[keep]]
+
+
+# DataFrame OHLCV indexé par date, les colonnes sont des vues sur le tableau (n, 6)
+def candles_to_dataframe(candles) -> pd.DataFrame:
+    index = pd.DatetimeIndex(
+        pd.to_datetime(candles[:, 0].astype(np.int64), unit="ms"), name="date"
+    )
+    return pd.DataFrame(candles[:, 1:], index=index, columns=OHLCV_COLUMNS[1:], copy=False)
+
+
+# Stockage local des bougies : un fichier binaire float64 (n, 6) par paire/timeframe, en ajout seul
+class OhlcvStore:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    # Chemin du fichier d'une paire/timeframe
+    def file_path(self, pair, timeframe) -> str:
+        name = pair.replace("/", "-").replace(":", "_")
+        return os.path.join(self.path, f"{name}_{timeframe}.bin")
+
+    # Lire les bougies stockées en mémoire partagée (memmap), sans charger le fichier
+    def read(self, pair, timeframe) -> np.ndarray:
+        file = self.file_path(pair, timeframe)
+        rows = os.path.getsize(file) // ROW_BYTES if os.path.exists(file) else 0
+        if rows == 0:
+            return np.empty((0, len(OHLCV_COLUMNS)), dtype=np.float64)
+        return np.memmap(
+            file, dtype=np.float64, mode="r", shape=(rows, len(OHLCV_COLUMNS))
+        )
+
+    # Timestamp (ms) de la première bougie stockée
+    def first_timestamp(self, pair, timeframe):
+        data = self.read(pair, timeframe)
+        if len(data) == 0:
+            return None
+        return int(data[0, 0])
+
+    # Timestamp (ms) de la dernière bougie stockée
+    def last_timestamp(self, pair, timeframe):
+        data = self.read(pair, timeframe)
+        if len(data) == 0:
+            return None
+        return int(data[-1, 0])
+
+    # Supprimer les bougies stockées d'une paire/timeframe
+    def clear(self, pair, timeframe):
+        file = self.file_path(pair, timeframe)
+        if os.path.exists(file):
+            os.remove(file)
+
+    # Ajouter les bougies plus récentes que la dernière stockée
+    def append(self, pair, timeframe, candles) -> int:
+        candles = np.asarray(candles, dtype=np.float64).reshape(-1, len(OHLCV_COLUMNS))
+        last_ts = self.last_timestamp(pair, timeframe)
+        if last_ts is not None:
+            candles = candles[candles[:, 0] > last_ts]
+        if len(candles) == 0:
+            return 0
+        candles = sort_unique_candles(candles)
+        file = self.file_path(pair, timeframe)
+        with open(file, "ab") as f:
+            # Supprimer une ligne partielle laissée par une écriture interrompue
+            aligned = (f.tell() // ROW_BYTES) * ROW_BYTES
+            if aligned != f.tell():
+                f.truncate(aligned)
+            f.write(np.ascontiguousarray(candles).tobytes())
+        return len(candles)
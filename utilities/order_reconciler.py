@@ -0,0 +1,163 @@
+from typing import List
+import asyncio
+from pydantic import BaseModel
+from utilities.bitget_perp import Order, TriggerOrder, OpenOrdersSnapshot
+
+
+class TriggerOrderAmend(BaseModel):
+    order: TriggerOrder
+    target: dict
+
+
+# Actions nécessaires pour passer du carnet réel au carnet voulu
+class ReconciliationPlan(BaseModel):
+    cancel_orders: List[Order] = []
+    cancel_trigger_orders: List[TriggerOrder] = []
+    amend_trigger_orders: List[TriggerOrderAmend] = []
+    place_orders: List[dict] = []
+    place_trigger_orders: List[dict] = []
+    kept: int = 0
+
+
+# Réconciliation carnet voulu / carnet réel : seuls les annulations, modifications et nouveaux ordres nécessaires sont envoyés
+# Un ordre voulu est un dict avec les arguments de place_order (ou de place_trigger_order s'il a un trigger_price)
+# size_tolerance ne s'applique qu'aux ordres d'entrée, la taille d'un ordre reduce only doit être exacte
+class OrderReconciler:
+    def __init__(self, exchange, price_tolerance=0.001, size_tolerance=0.01):
+        self.exchange = exchange
+        self.price_tolerance = price_tolerance
+        self.size_tolerance = size_tolerance
+
+    def _close(self, live, target, tolerance) -> bool:
+        live = float(live or 0)
+        target = float(target or 0)
+        if target == 0:
+            return live == 0
+        return abs(live - target) / abs(target) <= tolerance
+
+    # Un ordre reduce only doit couvrir exactement la taille voulue (celle de la position) : pas de tolérance,
+    # les deux tailles sont comparées après arrondi à la précision de la paire
+    def _same_size(self, live, target) -> bool:
+        if target.get("reduce", False):
+            return float(self.exchange.amount_to_precision(target["pair"], live.size)) == float(
+                self.exchange.amount_to_precision(target["pair"], target["size"])
+            )
+        return self._close(live.size, target["size"], self.size_tolerance)
+
+    def _matches(self, live, target) -> bool:
+        if not self._same_size(live, target):
+            return False
+        if not self._close(live.price, target.get("price"), self.price_tolerance):
+            return False
+        if isinstance(live, TriggerOrder):
+            return self._close(live.trigger_price, target["trigger_price"], self.price_tolerance)
+        return True
+
+    def _key(self, pair, side, reduce, type, trigger):
+        return (pair, side, bool(reduce), type, trigger)
+
+    def _reference_price(self, order) -> float:
+        if isinstance(order, dict):
+            return float(order.get("trigger_price") or order.get("price") or 0)
+        if isinstance(order, TriggerOrder):
+            return order.trigger_price
+        return order.price
+
+    # Comparer le carnet voulu au snapshot des ordres ouverts
+    def diff(self, desired, snapshot: OpenOrdersSnapshot) -> ReconciliationPlan:
+        plan = ReconciliationPlan()
+        groups = {}
+        for target in desired:
+            key = self._key(
+                target["pair"],
+                target["side"],
+                target.get("reduce", False),
+                target.get("type", "limit"),
+                "trigger_price" in target,
+            )
+            groups.setdefault(key, ([], []))[0].append(target)
+        for pair_orders in snapshot.orders.values():
+            for order in pair_orders:
+                key = self._key(order.pair, order.side, order.reduce, order.type, False)
+                groups.setdefault(key, ([], []))[1].append(order)
+        for pair_orders in snapshot.trigger_orders.values():
+            for order in pair_orders:
+                key = self._key(order.pair, order.side, order.reduce, order.type, True)
+                groups.setdefault(key, ([], []))[1].append(order)
+
+        for key, (targets, lives) in groups.items():
+            trigger = key[4]
+            targets = sorted(targets, key=self._reference_price)
+            lives = sorted(lives, key=self._reference_price)
+            remaining_targets = []
+            for target in targets:
+                match = None
+                for live in lives:
+                    if self._matches(live, target) and (
+                        match is None
+                        or abs(live.price - float(target.get("price") or 0))
+                        < abs(match.price - float(target.get("price") or 0))
+                    ):
+                        match = live
+                if match is None:
+                    remaining_targets.append(target)
+                else:
+                    lives.remove(match)
+                    plan.kept += 1
+            # Les ordres plan restants sont modifiés sur place, les ordres normaux sont remplacés
+            if trigger:
+                amend_count = min(len(lives), len(remaining_targets))
+                for live, target in zip(lives[:amend_count], remaining_targets[:amend_count]):
+                    plan.amend_trigger_orders.append(TriggerOrderAmend(order=live, target=target))
+                plan.cancel_trigger_orders += lives[amend_count:]
+                plan.place_trigger_orders += remaining_targets[amend_count:]
+            else:
+                plan.cancel_orders += lives
+                plan.place_orders += remaining_targets
+        return plan
+
+    # Exécuter un plan : annulations, modifications puis nouveaux ordres (sorties avant entrées)
+    async def apply(self, plan: ReconciliationPlan):
+        cancel_tasks = []
+        for pair in {order.pair for order in plan.cancel_orders}:
+            ids = [order.id for order in plan.cancel_orders if order.pair == pair]
+            cancel_tasks.append(self.exchange.cancel_orders(pair, ids))
+        for pair in {order.pair for order in plan.cancel_trigger_orders}:
+            ids = [order.id for order in plan.cancel_trigger_orders if order.pair == pair]
+            cancel_tasks.append(self.exchange.cancel_trigger_orders(pair, ids))
+        await asyncio.gather(*cancel_tasks)
+
+        amends = await asyncio.gather(
+            *[
+                self.exchange.edit_trigger_order(
+                    order_id=amend.order.id,
+                    pair=amend.target["pair"],
+                    side=amend.target["side"],
+                    price=amend.target.get("price"),
+                    trigger_price=amend.target["trigger_price"],
+                    size=amend.target["size"],
+                    type=amend.target.get("type", "limit"),
+                    reduce=amend.target.get("reduce", False),
+                )
+                for amend in plan.amend_trigger_orders
+            ]
+        )
+        # Une modification refusée est remplacée par une annulation suivie d'un nouvel ordre
+        failed = [amend for amend, resp in zip(plan.amend_trigger_orders, amends) if resp is None]
+        await asyncio.gather(
+            *[self.exchange.cancel_trigger_orders(amend.order.pair, [amend.order.id]) for amend in failed]
+        )
+        place_trigger_orders = plan.place_trigger_orders + [amend.target for amend in failed]
+
+        reduce_first = lambda order: not order.get("reduce", False)
+        await asyncio.gather(
+            self.exchange.place_orders_batch(sorted(plan.place_orders, key=reduce_first)),
+            self.exchange.place_trigger_orders_batch(sorted(place_trigger_orders, key=reduce_first)),
+        )
+
+    # Réconcilier le carnet voulu avec les ordres ouverts des paires concernées
+    async def reconcile(self, desired, pairs) -> ReconciliationPlan:
+        snapshot = await self.exchange.get_open_orders_snapshot(pairs)
+        plan = self.diff(desired, snapshot)
+        await self.apply(plan)
+        return plan
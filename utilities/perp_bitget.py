@@ -3,9 +3,11 @@ import pandas as pd
 import time
 from multiprocessing.pool import ThreadPool as Pool
 import numpy as np
+import threading
+from utilities.markets_cache import read_markets_cache, write_markets_cache
 
 class PerpBitget():
-    def __init__(self, apiKey=None, secret=None, password=None):
+    def __init__(self, apiKey=None, secret=None, password=None, markets_cache_path=None, markets_cache_ttl=3600, tickers_ttl=1):
         bitget_auth_object = {
             "apiKey": apiKey,
             "secret": secret,
@@ -20,7 +22,37 @@ class PerpBitget():
         else:
             self._auth = True
             self._session = ccxt.bitget(bitget_auth_object)
-        self.market = self._session.load_markets()
+        self._markets_cache_path = markets_cache_path
+        self._tickers_ttl = tickers_ttl
+        self._tickers = {}
+        self._tickers_time = 0
+        self._tickers_lock = threading.Lock()
+        cache = read_markets_cache(markets_cache_path) if markets_cache_path else None
+        if cache is None:
+            self.market = self._session.load_markets()
+            self._write_markets_cache()
+        else:
+            markets, currencies, age = cache
+            self._session.set_markets(markets, currencies)
+            self.market = self._session.markets
+            if age > markets_cache_ttl:
+                threading.Thread(target=self._background_refresh_markets, daemon=True).start()
+
+    def _write_markets_cache(self):
+        if self._markets_cache_path:
+            write_markets_cache(self._markets_cache_path, self._session.markets, self._session.currencies)
+
+    # Charger sur une instance ccxt séparée (celle du thread principal n'est pas thread-safe), puis reprendre ses marchés
+    def _background_refresh_markets(self):
+        try:
+            loader = ccxt.bitget({'options': {'defaultType': 'swap'}})
+            loader.load_markets(reload=True)
+            self._session.set_markets(loader.markets, loader.currencies)
+            self.market = self._session.markets
+            if self._markets_cache_path:
+                write_markets_cache(self._markets_cache_path, loader.markets, loader.currencies)
+        except Exception as err:
+            print("Error refreshing markets cache", err)
 
     def authentication_required(fn):
         """Annotation for methods that require auth."""
@@ -68,9 +100,23 @@ class PerpBitget():
         del result['timestamp']
         return result.sort_index()
 
+    # Tickers de tous les contrats USDT-FUTURES en une requête, gardés en cache tickers_ttl secondes (ou max_age)
+    def get_tickers(self, symbols=None, max_age=None):
+        max_age = self._tickers_ttl if max_age is None else max_age
+        with self._tickers_lock:
+            if time.time() - self._tickers_time > max_age:
+                self._tickers = self._session.fetch_tickers(None, params={"type": "swap", "productType": "USDT-FUTURES"})
+                self._tickers_time = time.time()
+            tickers = self._tickers
+        if symbols is None:
+            return dict(tickers)
+        return {symbol: tickers[symbol] for symbol in symbols if symbol in tickers}
+
     def get_bid_ask_price(self, symbol):
         try:
-            ticker = self._session.fetchTicker(symbol)
+            ticker = self.get_tickers([symbol]).get(symbol)
+            if ticker is None:
+                ticker = self._session.fetchTicker(symbol)
         except BaseException as err:
             raise Exception(err)
         return {"bid":ticker["bid"],"ask":ticker["ask"]}
@@ -0,0 +1,168 @@
+import json
+import os
+import ccxt.async_support as ccxt
+
+# Bornes (secondes) des histogrammes de latence et d'attente
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf")]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rate_limit_errors = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rate_limit_errors": self.rate_limit_errors,
+            "latency_sum": self.latency_sum,
+            "latency_max": self.latency_max,
+            "latency_avg": self.latency_sum / self.calls if self.calls else 0.0,
+            "latency_buckets": {
+                str(bound): count for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets)
+            },
+            "wait_sum": self.wait_sum,
+            "wait_max": self.wait_max,
+        }
+
+
+# Temps d'attente dans une voie de priorité de l'ordonnanceur
+class LaneStats:
+    def __init__(self):
+        self.calls = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * len(LATENCY_BUCKETS)
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "wait_sum": self.wait_sum,
+            "wait_max": self.wait_max,
+            "wait_avg": self.wait_sum / self.calls if self.calls else 0.0,
+            "wait_buckets": {
+                str(bound): count for bound, count in zip(LATENCY_BUCKETS, self.wait_buckets)
+            },
+        }
+
+
+# Métriques des requêtes par endpoint ccxt : nombre d'appels, histogramme de latence, erreurs
+# et temps d'attente dans l'ordonnanceur (limite de débit et concurrence), aussi par voie de priorité
+# Une même instance peut être partagée entre plusieurs clients
+class RequestMetrics:
+    def __init__(self):
+        self.endpoints = {}
+        self.lanes = {}
+
+    # Enregistrer un appel terminé : wait = attente avant envoi, latency = durée de l'appel, en secondes
+    def record(self, endpoint, wait, latency, error=None, lane=None):
+        stats = self.endpoints.setdefault(endpoint, EndpointStats())
+        stats.calls += 1
+        stats.latency_sum += latency
+        stats.latency_max = max(stats.latency_max, latency)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                stats.latency_buckets[i] += 1
+                break
+        stats.wait_sum += wait
+        stats.wait_max = max(stats.wait_max, wait)
+        if error is not None:
+            stats.errors += 1
+            if isinstance(error, ccxt.DDoSProtection):
+                stats.rate_limit_errors += 1
+        if lane is not None:
+            lane_stats = self.lanes.setdefault(lane, LaneStats())
+            lane_stats.calls += 1
+            lane_stats.wait_sum += wait
+            lane_stats.wait_max = max(lane_stats.wait_max, wait)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if wait <= bound:
+                    lane_stats.wait_buckets[i] += 1
+                    break
+
+    def reset(self):
+        self.endpoints = {}
+        self.lanes = {}
+
+    # Métriques par endpoint sous forme de dict
+    def snapshot(self) -> dict:
+        return {endpoint: stats.to_dict() for endpoint, stats in sorted(self.endpoints.items())}
+
+    # Attente par voie de priorité sous forme de dict
+    def lanes_snapshot(self) -> dict:
+        return {lane: stats.to_dict() for lane, stats in sorted(self.lanes.items())}
+
+    # Résumé lisible trié par temps total passé, du plus lent au plus rapide
+    def summary(self) -> str:
+        lines = [f"{'endpoint':<45}{'calls':>7}{'errors':>8}{'total s':>10}{'avg s':>9}{'max s':>9}{'wait s':>9}"]
+        for endpoint, stats in sorted(
+            self.endpoints.items(), key=lambda item: item[1].latency_sum, reverse=True
+        ):
+            lines.append(
+                f"{endpoint:<45}{stats.calls:>7}{stats.errors:>8}{stats.latency_sum:>10.2f}"
+                f"{stats.latency_sum / stats.calls:>9.3f}{stats.latency_max:>9.3f}{stats.wait_sum:>9.2f}"
+            )
+        if self.lanes:
+            lines.append("")
+            lines.append(f"{'lane':<45}{'calls':>7}{'wait s':>10}{'avg s':>9}{'max s':>9}")
+            for lane, stats in sorted(self.lanes.items()):
+                lines.append(
+                    f"{lane:<45}{stats.calls:>7}{stats.wait_sum:>10.2f}"
+                    f"{stats.wait_sum / stats.calls:>9.3f}{stats.wait_max:>9.3f}"
+                )
+        return "\n".join(lines)
+
+    # Format texte Prometheus (pour le textfile collector de node_exporter)
+    def to_prometheus(self, prefix="bitget") -> str:
+        lines = [
+            f"# TYPE {prefix}_requests_total counter",
+            f"# TYPE {prefix}_request_errors_total counter",
+            f"# TYPE {prefix}_request_rate_limit_errors_total counter",
+            f"# TYPE {prefix}_request_wait_seconds_total counter",
+            f"# TYPE {prefix}_request_duration_seconds histogram",
+            f"# TYPE {prefix}_lane_wait_seconds histogram",
+        ]
+        for endpoint, stats in sorted(self.endpoints.items()):
+            label = f'endpoint="{endpoint}"'
+            lines.append(f"{prefix}_requests_total{{{label}}} {stats.calls}")
+            lines.append(f"{prefix}_request_errors_total{{{label}}} {stats.errors}")
+            lines.append(f"{prefix}_request_rate_limit_errors_total{{{label}}} {stats.rate_limit_errors}")
+            lines.append(f"{prefix}_request_wait_seconds_total{{{label}}} {stats.wait_sum}")
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats.latency_buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else str(bound)
+                lines.append(f'{prefix}_request_duration_seconds_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f"{prefix}_request_duration_seconds_sum{{{label}}} {stats.latency_sum}")
+            lines.append(f"{prefix}_request_duration_seconds_count{{{label}}} {stats.calls}")
+        for lane, stats in sorted(self.lanes.items()):
+            label = f'lane="{lane}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats.wait_buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else str(bound)
+                lines.append(f'{prefix}_lane_wait_seconds_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f"{prefix}_lane_wait_seconds_sum{{{label}}} {stats.wait_sum}")
+            lines.append(f"{prefix}_lane_wait_seconds_count{{{label}}} {stats.calls}")
+        return "\n".join(lines) + "\n"
+
+    # Écrire les métriques de façon atomique, en JSON ou au format Prometheus selon l'extension (.prom)
+    # Le JSON regroupe les endpoints et les files de priorité : {"endpoints": ..., "lanes": ...}
+    def dump(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            if path.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump({"endpoints": self.snapshot(), "lanes": self.lanes_snapshot()}, f, indent=2)
+        os.replace(tmp_path, path)